@@ -0,0 +1,133 @@
+'''
+asyncio driver of the M/M/s queueing simulation
+Brief description:
+Runs QueueSim.EventQueue instances inside an asyncio event loop, handing
+control back to the loop between batches of events, so that simulations do
+not block the other tasks of the loop and many of them can run concurrently
+in one process.
+
+Detailed description:
+run_async() drives EventQueue.run_until() from callbacks scheduled with
+loop.call_soon(), one batch per callback, and returns a future. Between two
+batches every other ready callback of the loop runs, so the latency a
+simulation adds to the loop is the time of one batch, while larger batches
+spend less time in the loop machinery. Concurrent simulations advance in
+turns, one batch each. The module uses no coroutine syntax, so it can be
+imported under Python 2, where trollius is used in place of asyncio.
+Functions:
+    run_async(eq,simulationLength,batch=1024,callback=None,loop=None):
+                               schedules the simulation of EventQueue eq
+                               until time simulationLength on loop (the
+                               running event loop if None, then run_async()
+                               must be called from code running on the
+                               loop) and returns a future of its final
+                               snapshot, callback is
+                               called with (eq, snapshot) after each batch,
+                               cancelling the future stops the simulation,
+                               an exception raised by callback is set on
+                               the future
+    run_many(queues,simulationLength,batch=1024,callback=None):
+                               runs the EventQueues in queues concurrently
+                               on a new event loop and returns the list of
+                               their final snapshots
+'''
+
+__version__    = '1.0.0'
+__author__     = 'Aykut Bulut, Ted Ralphs (ayb211@lehigh.edu,ted@lehigh.edu)'
+__license__    = 'MIT'
+__maintainer__ = 'Aykut Bulut'
+__email__      = 'ayb211@lehigh.edu'
+__title__      = 'M/M/s queueing system asyncio driver'
+
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+
+def _running_loop():
+    '''
+    Returns the running event loop. Under Python 3.7 and later
+    RuntimeError is raised if no loop is running.
+    '''
+    get = getattr(asyncio, 'get_running_loop', None)
+    if get is not None:
+        return get()
+    # Python < 3.7 and trollius, where get_event_loop() is not deprecated
+    return asyncio.get_event_loop()
+
+
+def _create_future(loop):
+    '''
+    Returns a new future attached to loop
+    '''
+    create = getattr(loop, 'create_future', None)
+    if create is not None:
+        return create()
+    return asyncio.Future(loop = loop)
+
+
+def run_async(eq, simulationLength, batch = 1024, callback = None,
+              loop = None):
+    '''
+    Schedules the simulation of eq until time simulationLength on loop, one
+    batch of at most batch events per loop iteration, and returns a future
+    whose result is the final EventQueue.snapshot(). If loop is None, the
+    running event loop is used.
+    '''
+    if loop is None:
+        loop = _running_loop()
+    future = _create_future(loop)
+    batches = eq.run_until(simulationLength, batch)
+    # Snapshot of an EventQueue that is already at simulationLength
+    last = [None]
+    def advance():
+        if future.cancelled():
+            batches.close()
+            return
+        try:
+            last[0] = next(batches)
+        except StopIteration:
+            if last[0] is None:
+                last[0] = eq.snapshot()
+            future.set_result(last[0])
+            return
+        except Exception as e:
+            future.set_exception(e)
+            return
+        try:
+            if callback is not None:
+                callback(eq, last[0])
+        except Exception as e:
+            # An error of the callback fails the simulation rather than
+            # leaving the future pending
+            batches.close()
+            future.set_exception(e)
+            return
+        loop.call_soon(advance)
+    loop.call_soon(advance)
+    return future
+
+
+def run_many(queues, simulationLength, batch = 1024, callback = None):
+    '''
+    Runs the EventQueues in queues concurrently until time simulationLength
+    on a new event loop and returns the list of their final snapshots
+    '''
+    loop = asyncio.new_event_loop()
+    try:
+        futures = [run_async(eq, simulationLength, batch, callback, loop)
+                   for eq in queues]
+        return loop.run_until_complete(asyncio.gather(*futures))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    from QueueSim import EventQueue
+    queues = [EventQueue(seedInput = s, IAT = 1, ST = 11, server_num = 11,
+                         queueing_mode = m)
+              for s in range(4) for m in ('single', 'shortest')]
+    for eq, snapshot in zip(queues, run_many(queues, 1000)):
+        print('%-10s seed %d  TIS %g' % (eq.queueing_mode, eq.seed,
+                                         snapshot['TIS'][1]))
@@ -0,0 +1,223 @@
+'''
+Closed-form steady state of M/M/s configurations
+Brief description:
+Computes the steady-state waiting time, time in system, queue length and
+utilization of the QueueSim.EventQueue configurations that have closed
+forms, caches them, and answers queries analytically when possible and by
+simulation otherwise.
+
+Detailed description:
+With arrival rate lambda = 1/IAT, service rate mu = 1/ST, offered load
+a = lambda/mu and s servers, the 'single' queueing mode is an M/M/s queue.
+When a < s it has the steady state
+    C = B(s,a)/(1 - (a/s)(1 - B(s,a)))       probability of waiting
+    Wq = C ST/(s - a)                        mean waiting time
+    W = Wq + ST                              mean time in system
+    Lq = lambda Wq,  L = Lq + a              mean number waiting, in system
+    rho = a/s                                utilization
+where B is the Erlang B blocking probability. B is computed by the
+recursion B(0,a) = 1, B(k,a) = a B(k-1,a)/(k + a B(k-1,a)), whose terms
+stay in [0, 1], so it neither overflows nor cancels for large s, as
+opposed to the textbook formula with a^s/s!. In 'random' mode each station
+receives a Poisson stream of rate lambda pi[i] and is an M/M/1 queue, and
+with a single server every queueing mode is an M/M/1 queue. Other
+configurations, variate sources given as objects and unstable systems have
+no closed form here and are simulated.
+Functions:
+    erlang_b(servers,load):    returns the Erlang B blocking probability
+    erlang_c(servers,load):    returns the Erlang C probability of waiting,
+                               load < servers
+    mms(IAT,ST,server_num):    returns the steady state of an M/M/s queue as
+                               a dictionary with keys 'waitProbability',
+                               'waitingTime', 'serviceTime', 'TIS',
+                               'queueLength', 'inSystem' and 'utilization',
+                               results are cached
+    analytic(**params):        returns the steady state of the EventQueue
+                               built from params, in the layout of mms(),
+                               or None if there is no closed form
+    simulated(eq):             returns the statistics of a simulated
+                               EventQueue in the layout of mms()
+    solve(length=None,simulate=False,**params):
+                               returns a dictionary with key 'method',
+                               'analytic' if the closed form is used and
+                               'simulation' if params are simulated for
+                               length time units, because there is no closed
+                               form or simulate is True, and key 'result'
+                               in the layout of mms(); when a simulated
+                               configuration has a closed form, the key
+                               'analytic' holds it and 'deviation' the
+                               relative deviations (simulated - analytic) /
+                               analytic of the keys of the simulation
+    clear_cache():             empties the cache of mms()
+'''
+
+__version__    = '1.0.0'
+__author__     = 'Aykut Bulut, Ted Ralphs (ayb211@lehigh.edu,ted@lehigh.edu)'
+__license__    = 'MIT'
+__maintainer__ = 'Aykut Bulut'
+__email__      = 'ayb211@lehigh.edu'
+__title__      = 'M/M/s queueing system closed forms'
+
+import inspect
+from QueueSim import EventQueue
+
+# Results of mms() keyed by (IAT, ST, server_num)
+_CACHE = {}
+
+
+def erlang_b(servers, load):
+    '''
+    Returns the Erlang B blocking probability of servers servers with
+    offered load load
+    '''
+    b = 1.0
+    for k in range(1, servers + 1):
+        b = load*b/(k + load*b)
+    return b
+
+
+def erlang_c(servers, load):
+    '''
+    Returns the Erlang C probability that an arriving customer waits,
+    load must be less than servers
+    '''
+    if not 0 <= load < servers:
+        raise ValueError('load must be in [0, servers)')
+    b = erlang_b(servers, load)
+    return b/(1 - load/float(servers)*(1 - b))
+
+
+def mms(IAT, ST, server_num):
+    '''
+    Returns the steady state of the M/M/s queue with mean inter-arrival time
+    IAT, mean service time ST and server_num servers, see the file
+    documentation for the keys. Results are cached.
+    '''
+    key = (IAT, ST, server_num)
+    if key not in _CACHE:
+        load = ST/float(IAT)
+        c = erlang_c(server_num, load)
+        wait = c*ST/(server_num - load)
+        _CACHE[key] = {'waitProbability':c,
+                       'waitingTime':wait,
+                       'serviceTime':float(ST),
+                       'TIS':wait + ST,
+                       'queueLength':wait/IAT,
+                       'inSystem':wait/IAT + load,
+                       'utilization':load/server_num}
+    return dict(_CACHE[key])
+
+
+def clear_cache():
+    '''
+    Empties the cache of mms()
+    '''
+    _CACHE.clear()
+
+
+def _params(params):
+    '''
+    Returns params completed with the defaults of the EventQueue constructor
+    '''
+    try:
+        spec = inspect.getfullargspec(EventQueue.__init__)
+    except AttributeError:
+        spec = inspect.getargspec(EventQueue.__init__)
+    full = dict(zip(spec.args[-len(spec.defaults):], spec.defaults))
+    full.update(params)
+    return full
+
+
+def _routing(pi, queue_num):
+    '''
+    Returns the routing probabilities used by EventQueue.set_pi() for pi
+    '''
+    if pi is None:
+        pi = [1/float(queue_num)]*queue_num
+    pi = list(pi)
+    pi[queue_num - 1] = 1 - sum(pi[:queue_num-1])
+    return pi
+
+
+def analytic(**params):
+    '''
+    Returns the steady state of the EventQueue built from params in the
+    layout of mms(), None if it has no closed form or is unstable
+    '''
+    p = _params(params)
+    IAT, ST, s = p['IAT'], p['ST'], p['server_num']
+    if p['variates'] not in ('python', 'numpy') or ST >= s*IAT:
+        return None
+    if p['queueing_mode'] == 'single' or s == 1:
+        return mms(IAT, ST, s)
+    if p['queueing_mode'] != 'random':
+        return None
+    pi = _routing(p['pi'], s)
+    if min(pi) < 0 or max(pi)*ST >= IAT:
+        return None
+    result = dict.fromkeys(('waitProbability', 'waitingTime', 'queueLength',
+                            'inSystem'), 0.0)
+    for q in pi:
+        if q == 0:
+            continue
+        station = mms(IAT/q, ST, 1)
+        # Customer averages are weighted by the routing probabilities,
+        # the numbers of customers are summed over the stations
+        for name in ('waitProbability', 'waitingTime'):
+            result[name] += q*station[name]
+        for name in ('queueLength', 'inSystem'):
+            result[name] += station[name]
+    result.update({'serviceTime':float(ST),
+                   'TIS':result['waitingTime'] + ST,
+                   'utilization':ST/float(IAT*s)})
+    return result
+
+
+def simulated(eq):
+    '''
+    Returns the statistics of the simulated EventQueue eq in the layout of
+    mms(), without 'waitProbability'
+    '''
+    stat = eq.get_stat()
+    average = eq.get_time_average()
+    return {'waitingTime':stat['waitingTime'][1],
+            'serviceTime':stat['serviceTime'][1],
+            'TIS':stat['TIS'][1],
+            'queueLength':average['queueLength'],
+            'inSystem':average['inSystem'],
+            'utilization':average['utilization']}
+
+
+def solve(length = None, simulate = False, **params):
+    '''
+    Returns the closed-form steady state of the EventQueue built from
+    params if there is one, otherwise, or if simulate is True, simulates it
+    for length time units. See the file documentation for the result.
+    '''
+    closed = analytic(**params)
+    if closed is not None and not simulate:
+        return {'method':'analytic', 'result':closed}
+    if length is None:
+        raise ValueError('no closed form, length is needed to simulate')
+    eq = EventQueue(**dict(params, graphics_mode = 'off'))
+    eq.simulate(length)
+    result = {'method':'simulation', 'result':simulated(eq)}
+    if closed is not None:
+        result['analytic'] = closed
+        result['deviation'] = dict((name, (value - closed[name])/closed[name]
+                                    if closed[name] else value)
+                                   for name, value in result['result'].items())
+    return result
+
+
+if __name__ == '__main__':
+    params = dict(seedInput = 1, IAT = 1, ST = 9, server_num = 11,
+                  queueing_mode = 'single')
+    checked = solve(100000, simulate = True, **params)
+    print('%-16s%-16s%-16s%-16s' % ('', 'Analytic', 'Simulation',
+                                    'Deviation'))
+    for name in ('waitingTime', 'TIS', 'queueLength', 'utilization'):
+        print('%-16s%-16.6g%-16.6g%-+16.3g' % (name,
+                                               checked['analytic'][name],
+                                               checked['result'][name],
+                                               checked['deviation'][name]))
@@ -23,7 +23,7 @@ Event:
         serverNumber:          server that serves the corresponding customer
                                of the event (arrival/departure)
                                type: int
-        name:                  name of the event
+        name:                  name of the event, built on first access
                                type: string
     methods:
         __init__(self,eventType,number,eventTime,server=None):
@@ -42,6 +42,134 @@ Event:
                                other.eventTime
         __ne__(self,other):    returns True if self.eventTime != 
                                other.eventTime
+        __hash__(self):        identity hash, so that events can be
+                               dictionary keys under Python 3 as well
+HeapEventTable:
+    Event calendar kept as a binary heap of plain tuples. Each entry is
+    (eventTime, eventNumber, eventType, serverNumber); since event numbers
+    are unique and increasing, events with equal times are popped in
+    insertion order and the comparison never reaches the last two fields.
+    attributes:
+        heap:                  heap-ordered list of event tuples
+                               type: list
+    methods:
+        __init__(self):        constructor of the class
+        isEmpty(self):         returns True if there are no events
+        push(self,eventType,eventNumber,eventTime,serverNumber=None):
+                               inserts a new event
+        pop(self):             removes and returns the earliest event tuple
+        size(self):            returns the number of events
+EventObjectTable:
+    Event calendar that stores Event instances in a coinor.blimpy
+    PriorityQueue. This is the original calendar, kept as a selectable
+    backend. It has the same methods as HeapEventTable and pop() returns
+    the same tuple layout.
+IndexedHeap:
+    Min-heap over a fixed set of items 0,...,n-1 with integer keys, where
+    the key of any item can be changed in O(log n) time. It is used to keep
+    the number of customers at each station in 'shortest' mode. Ties are
+    broken by item index.
+    attributes:
+        heap:                  heap-ordered list of items
+                               type: list
+        pos:                   position of each item in heap
+                               type: list
+        key:                   key of each item
+                               type: list
+    methods:
+        __init__(self,n):      constructor of the class, all keys are 0
+        min(self):             returns the item with the smallest key
+        increment(self,i):     increases the key of item i by 1
+        decrement(self,i):     decreases the key of item i by 1
+AliasTable:
+    Table for drawing an item of 0,...,n-1 from a discrete distribution in
+    O(1) time with a single uniform variate. Column i holds item i with
+    probability prob[i] and item alias[i] otherwise. It is used to route
+    customers in 'random' mode.
+    attributes:
+        n:                     number of items
+                               type: int
+        prob:                  probability of keeping the column item
+                               type: list
+        alias:                 alias item of each column
+                               type: list
+    methods:
+        __init__(self,weights):
+                               constructor of the class, the distribution is
+                               proportional to the nonnegative weights
+        sample(self,u):        returns the item drawn by the uniform(0,1)
+                               variate u
+RunningStat:
+    Online accumulator of the number of observations, their mean and
+    variance (Welford's method). Uses O(1) memory regardless of the number of
+    observations.
+    attributes:
+        n:                     number of observations
+                               type: int
+        mean:                  mean of the observations
+                               type: float
+        m2:                    sum of squared deviations from the mean
+                               type: float
+    methods:
+        __init__(self):        constructor of the class
+        add(self,x):           adds observation x
+        variance(self):        returns the sample variance
+        stdev(self):           returns the sample standard deviation
+BatchMeans:
+    Batch means of a sequence of observations in O(batches) memory. Between
+    batches and 2*batches batch means are kept, when 2*batches are reached
+    adjacent batches are merged and batch_size is doubled. The warm-up
+    period is deleted with the MSER rule, which truncates the leading batches
+    that minimize the variance of the mean of the remaining ones.
+    attributes:
+        batches:               minimum number of batches kept
+                               type: int
+        batch_size:            number of observations per batch
+                               type: int
+        means:                 means of the completed batches
+                               type: list
+        completed:             number of batches completed so far
+                               type: int
+    methods:
+        __init__(self,batches=32,batch_size=10):
+                               constructor of the class
+        add(self,x):           adds observation x
+        warmup(self):          returns the number of leading batches deleted
+                               by the MSER rule
+        estimate(self,confidence=0.95):
+                               returns a tuple (mean, half-width, deleted
+                               batches, batches used) after deleting the
+                               warm-up period
+        correlation(self,d=0): returns the von Neumann statistic of the
+                               batch means after the first d, approximately
+                               standard normal if they are independent and
+                               large if they are positively correlated
+QuantileSketch:
+    Quantile estimates of a sequence of observations in bounded memory
+    (merging t-digest). Observations are buffered and periodically merged
+    into at most about compression weighted centroids, which are small near
+    the extremes, so tail quantiles are accurate. Sketches of different
+    runs can be merged, the result is as if all observations were added to
+    one sketch.
+    attributes:
+        n:                     number of observations merged so far
+                               type: int
+        means:                 centroid means in increasing order
+                               type: list
+        weights:               number of observations of each centroid
+                               type: list
+        buffer:                observations not merged yet
+                               type: list
+        min, max:              smallest and largest observation merged
+                               type: float
+    methods:
+        __init__(self,compression=200,buffer_size=2000):
+                               constructor of the class, observations are
+                               merged buffer_size at a time
+        add(self,x):           adds observation x
+        merge(self,other):     adds the observations of QuantileSketch other
+        quantile(self,q):      returns the estimated q quantile, None if
+                               there are no observations
 Customer:
     A very basic class that defines customer types. It only has __init__()
     method that initializes attributes.
@@ -56,11 +184,113 @@ Customer:
         __init__(self,entryTime,serviceTime,customerNumber):
                               constructor of the class, inputs are as in the
                               attributes section 
+CustomerRingBuffer:
+    FIFO queue of waiting customers kept in a ring buffer of parallel typed
+    arrays (entryTime, serviceTime, number), so that a waiting customer
+    takes 24 bytes and no object is allocated per customer. The capacity is
+    doubled when the buffer is full.
+    attributes:
+        entryTime:             arrival times of the customers
+                               type: array('d')
+        serviceTime:           service times of the customers
+                               type: array('d')
+        number:                numbers of the customers
+                               type: array('l')
+        head:                  index of the first customer
+                               type: int
+        count:                 number of customers in the queue
+                               type: int
+    methods:
+        __init__(self,capacity=16):
+                               constructor of the class, capacity is rounded
+                               up to a power of 2
+        isEmpty(self):         returns True if the queue is empty
+        enqueue(self,entryTime,serviceTime,number):
+                               inserts a customer at the end of the queue
+        dequeue(self):         removes the first customer and returns the
+                               tuple (entryTime, serviceTime, number)
+        size(self):            returns the number of customers in the queue
+CustomerObjectQueue:
+    FIFO queue of Customer instances in a coinor.blimpy Queue. This is the
+    original queue, kept as a selectable type. It has the same methods as
+    CustomerRingBuffer.
+PythonVariates:
+    Source of the random variates of a single EventQueue instance, backed by
+    its own random.Random generators. Variates are drawn one at a time.
+    With streams == 'shared' one generator produces all variates. With
+    streams == 'separate' inter-arrival times, service times and routing
+    uniforms come from three generators seeded by substream_seeds(), so
+    runs in different queueing modes with the same seed see the same
+    customers (common random numbers). With antithetic == True every
+    uniform U behind a variate is replaced by 1 - U.
+    attributes:
+        rngs:                  generators of inter-arrival times, service
+                               times and routing uniforms, the same object
+                               three times if streams == 'shared'
+                               type: tuple
+        interarrival:          callable returning the next inter-arrival time
+        service:               callable returning the next service time
+        uniform:               callable returning the next uniform(0,1)
+                               variate, used for routing
+        IAT, ST, antithetic:   constructor arguments, kept so that the
+                               callables can be rebuilt when unpickled
+    methods:
+        __init__(self,seedInput,IAT,ST,streams='shared',antithetic=False):
+                               constructor of the class, IAT and ST are the
+                               means of inter-arrival and service times
+NumpyVariates:
+    Same interface as PythonVariates, backed by numpy RandomStates.
+    Variates of each kind are generated in blocks of block_size and handed
+    out from a buffer, so a draw costs no Python-level arithmetic. Requires
+    numpy.
+    attributes:
+        buffers:               current (block, iterator) pair of each stream,
+                               the variates not handed out yet are pickled
+                               with the generators
+                               type: list
+    methods:
+        __init__(self,seedInput,IAT,ST,block_size=65536,streams='shared',
+                 antithetic=False):
+                               constructor of the class
+ArrayVariates:
+    Same interface as PythonVariates, replays given sequences of
+    inter-arrival times, service times and uniforms. Used to feed the same
+    variates to EventQueue and to the engine in FastSim.
+    methods:
+        __init__(self,interarrival,service,uniform=()):
+                               constructor of the class, inputs are
+                               sequences of variates
+Instrumentation:
+    Measures where the simulator spends its own time. When attached to an
+    EventQueue it shadows which_queue, add_event, get_event and
+    process_event of the instance with timing and counting wrappers, so an
+    EventQueue without instrumentation pays nothing.
+    attributes:
+        events:                number of processed events
+                               type: int
+        counts:                number of processed events by event type
+                               type: dict
+        seconds:               wall-clock seconds spent in which_queue,
+                               add_event and get_event
+                               type: dict
+    methods:
+        __init__(self,eq,callback=None,interval=1.0):
+                               constructor of the class, attaches to
+                               EventQueue eq, if callback is given it is
+                               called with snapshot() about every interval
+                               wall-clock seconds
+        snapshot(self):        returns a dictionary with keys 'events',
+                               'elapsed', 'eventsPerSecond', 'counts',
+                               'seconds' and 'simulationTime'
+        detach(self):          removes the wrappers from the EventQueue
 EventQueue:
     This class holds the attributes and methods for the simulatio of M/M/s
     queueing system
     attributes:
-        seed:                  seed used for random module
+        seed:                  seed of the random variate generator
+        variates:              source of inter-arrival times, service times
+                               and routing uniforms, private to the instance
+                               type: PythonVariates or NumpyVariates
         IAT:                   mean of inter-arrival times between two
                                consecutive arrivals, inter-arrival times
                                are assumed to be exponentially distributed
@@ -75,11 +305,25 @@ EventQueue:
                                type: list
         sqList                 list of queues, contains 1 queue if
                                queueing_mode == 'single', server_num queues 
-                               if queueing_mode in ('random', 'shortest')
-                               type: list
-        eventTable:            list that holds the events, events are sorted
-                               with respect to their occurance time
+                               otherwise
                                type: list
+        queue_type:            type of the queues in sqList, 'compact' for
+                               CustomerRingBuffer (default) or 'blimpy' for
+                               CustomerObjectQueue
+                               type: string
+        eventTable:            event calendar, events are sorted with
+                               respect to their occurance time, ties are
+                               broken by insertion order
+                               type: HeapEventTable or EventObjectTable
+        calendar:              event calendar backend, 'heap' for
+                               HeapEventTable (default) or 'blimpy' for
+                               EventObjectTable
+                               type: string
+        keep_records:          if True, per-customer statistics are kept in
+                               waitingTime, TIS and serviceTime, otherwise
+                               these stay empty and only the running
+                               statistics are updated
+                               type: bool
         waitingTime:           dictionary that holds the waiting times of the
                                customers in the queue, keys are customer 
                                numbers (Event numbers)
@@ -91,6 +335,23 @@ EventQueue:
         serviceTime:           service time of the customer, dictionary type,
                                keys are customer numbers
                                type: dict
+        waitStat:              running statistics of waiting times, updated
+                               when each customer starts service
+                               type: RunningStat
+        serviceStat:           running statistics of service times
+                               type: RunningStat
+        TISStat:               running statistics of time in system
+                               type: RunningStat
+        waitSketch:            quantile sketch of waiting times, updated
+                               when each customer starts service
+                               type: QuantileSketch
+        waitBatches:           batch means of waiting times, only kept while
+                               simulate_precision() runs, None otherwise
+                               type: BatchMeans
+        TISBatches:            batch means of time in system, only kept
+                               while simulate_precision() runs, None
+                               otherwise
+                               type: BatchMeans
         eventCounter:          arrival event counter, increases by 1 with
                                each arrival
                                type: int
@@ -106,26 +367,89 @@ EventQueue:
                                if mode == 'shortest', then the number of queues 
                                equals the number of servers and new customers
                                join the shortest queue
+                               if mode == 'power-of-d', then the number of
+                               queues equals the number of servers and new
+                               customers join the shortest of choices
+                               queues picked at random
                                type: string
+        pi:                    routing probabilities of the queues in
+                               'random' mode, set by set_pi()
+                               type: list
+        alias:                 alias table of pi, rebuilt by set_pi()
+                               type: AliasTable
+        choices:               number of queues sampled per arrival in
+                               'power-of-d' mode, at least 1
+                               type: int
         graphics_mode:         graphical mode, if graphics_mode == 'off', then
                                no graphics, graphics_mode == 'on', then
-                               simulate with graphics
+                               simulate with graphics, one event per frame,
+                               graphics_mode == 'live', then simulate at full
+                               speed (or time_warp) and redraw only the
+                               changed rectangles framerate times a second
                                type: string
+        framerate:             frames per second of the display
+                               type: int
+        time_warp:             simulated time units per wall-clock second in
+                               'live' graphics mode, None for as fast as
+                               possible
+                               type: float
         server_num:            number of servers
         queue_num:             number of queues
+        freeServers:           heap of idle server indices, kept up to date
+                               in 'single' mode so that an idle server is
+                               found in O(log s) time, None in other modes
+                               type: list
+        numWaiting:            number of customers waiting in the queues
+                               type: int
+        numBusy:               number of busy servers
+                               type: int
+        waitingArea:           integral of numWaiting over time
+                               type: float
+        busyArea:              integral of numBusy over time
+                               type: float
+        busyTime:              busy time of each server, not counting the
+                               current busy period
+                               type: list
+        busyStart:             start time of the current busy period of
+                               each server
+                               type: list
+        instrumentation:       attached instrumentation, None if off
+                               type: Instrumentation
+        trace:                 writer that records each processed event,
+                               None if tracing is off, see the Trace module
+                               type: Trace.TraceWriter
+        queueLength:           number of customers (waiting or in service)
+                               at each station, kept in 'shortest' mode so
+                               that the shortest queue is found in O(log s)
+                               time, None in other modes
+                               type: IndexedHeap
 
     methods:
         __init__(self, seedInput, IAT, ST, pi, server_num,
-                 queueing_mode, graphics_mode):
+                 queueing_mode, graphics_mode, calendar, keep_records,
+                 variates, block_size, queue_type, framerate, time_warp,
+                 trace, streams, antithetic, choices):
                                constructor of the class, seedInput is the
-                               seed of simulation, IAT and ST are as in
-                               attributes section
+                               seed of simulation, IAT, ST, calendar,
+                               keep_records, queue_type, framerate,
+                               time_warp and choices are as in attributes
+                               section, pi is passed to set_pi(),
+                               variates is 'python' for PythonVariates,
+                               'numpy' for NumpyVariates with blocks of
+                               block_size or a variate source object such
+                               as ArrayVariates, streams and antithetic are
+                               passed to PythonVariates or NumpyVariates,
+                               trace is None, the path of a trace file to
+                               create or a TraceWriter
         set_mode(self, server_num, queueing_mode, graphics_mode):
                                server_num is a positive integer
                                queueing_mode is either 'single', 'random',
-                               or 'shortest'
-                               graphics_mode is either string 'off' or 
-                               'on'
+                               'shortest' or 'power-of-d'
+                               graphics_mode is either string 'off', 'on'
+                               or 'live'
+        set_pi(self,pi=None):  sets the routing probabilities, equal ones if
+                               pi is None, the last one is set so that they
+                               sum to 1, and rebuilds the alias table
         which_queue(self):     when an arrival occurs this methods is called
                                if  there is an available server this method
                                returns to the tuple of (queue,server) where
@@ -134,18 +458,123 @@ EventQueue:
                                servers
                                if there is no available server, server value
                                returned is None
+                               'random' mode draws the queue from the alias
+                               table of pi, 'power-of-d' mode samples choices
+                               queues uniformly and picks the one with the
+                               fewest customers, both in O(1) time per
+                               arrival
         process_event(self,event):
                                processes event given and updates sqList and
-                               eventTable accordingly 
-        simulate(self, simulationLength):
-                               simulates the system for simulationLength time
-                               units
+                               eventTable accordingly, event is a tuple
+                               (eventTime, eventNumber, eventType,
+                               serverNumber) as returned by get_event()
+        simulate(self,simulationLength,checkpoint_path=None,
+                 checkpoint_interval=10.0):
+                               simulates the system until time
+                               simulationLength, a later call with a larger
+                               simulationLength continues the run, if
+                               checkpoint_path is given checkpoints are
+                               written to it about every checkpoint_interval
+                               wall-clock seconds and at the end
+        step(self,n=1):        processes the next n events and returns
+                               snapshot()
+        run_until(self,simulationLength,batch=1024):
+                               generator that simulates until time
+                               simulationLength in batches of at most batch
+                               events and yields snapshot() after each batch
+        snapshot(self):        returns get_stat() plus the current time,
+                               number of customers, number waiting, number
+                               of busy servers and time averages so far
+        simulate_checkpointed(self,simulationLength,path,interval):
+                               simulates the system until time
+                               simulationLength writing checkpoints to path
+        checkpoint(self,path): writes the state of the simulation to the file
+                               path, see restore()
+        simulate_precision(self,precision,maxLength,confidence,batches,
+                           independence):
+                               simulates until the confidence interval
+                               half-widths on the mean waiting time and time
+                               in system, computed by batch means after
+                               deleting the warm-up period, are at most
+                               precision times the means and the batch
+                               means pass a test of independence at level
+                               independence, or until time maxLength,
+                               returns a dictionary describing the
+                               estimates and the effort spent
+        close_trace(self):     writes the buffered trace records and closes
+                               the trace file
+        record_service(self,number,waitingTime,serviceTime):
+                               records the statistics of customer number
+                               when it starts service
+        get_stat(self):        returns a dictionary of (observations,
+                               average, stdev) tuples keyed by 'waitingTime',
+                               'serviceTime' and 'TIS'
+        get_quantiles(self,quantiles=(0.5,0.95,0.99)):
+                               returns a dictionary of the estimated
+                               quantiles of waiting time keyed by quantiles
         print_stat(self):      print statistics to stdout
-        add_event(self,event): adds event to the eventTable
-        get_event(self,event): gets the first event in the event table
+        add_event(self,eventType,eventTime,serverNumber=None):
+                               adds event to the eventTable
+        get_event(self):       removes the first event from the event table,
+                               advances currentTime and returns the event
+                               tuple
+        get_time_average(self):
+                               returns a dictionary of time-averaged
+                               metrics, see the method documentation
+        instrument(self,callback=None,interval=1.0):
+                               attaches and returns an Instrumentation
+        uninstrument(self):    detaches the Instrumentation
         draw_screen(self):     draws the status of the system to the screen
+        draw_changes(self):    draws the servers and customers that changed
+                               since the last call and updates only those
+                               parts of the screen
+        customer_rect(self,j,i):
+                               returns the rectangle of the i-th customer
+                               in the j-th queue
         display_init(self):    initializes pygame related parameters
 
+Functions
+    norm_quantile(p):          returns the p quantile of the standard normal
+                               distribution (Acklam's approximation)
+    t_quantile(p,df):          returns the p quantile of Student's t
+                               distribution with df degrees of freedom, exact
+                               for df <= 2, Cornish-Fisher expansion otherwise
+    load_blimpy():             imports Queue and PriorityQueue from
+                               coinor.blimpy, or the built-in stand-ins if
+                               it is not installed
+    substream_seeds(seedInput):
+                               returns the seeds of the inter-arrival,
+                               service and routing streams derived from
+                               seedInput
+    half_width(stat,confidence):
+                               returns the half-width of the confidence
+                               interval on the mean of RunningStat stat
+    restore(path,trace=None):  returns the EventQueue saved to the file path
+                               by EventQueue.checkpoint(), trace is as in the
+                               EventQueue constructor, a trace path of the
+                               checkpointed run is continued from the
+                               checkpoint
+
+Checkpoints
+    A checkpoint is the pickled EventQueue: event calendar, queues, server
+    states, generator states, buffered variates and accumulated statistics.
+    Queues and calendars are saved as compact sequences of their entries
+    rather than as object graphs. The trace writer, instrumentation and
+    pygame objects are not saved (see EventQueue.TRANSIENT), and a variate
+    source passed to the constructor has to be picklable. A run restored
+    from a checkpoint continues with exactly the events of the original run.
+    The number of trace records written is saved, so that restore() given
+    the trace file of the original run keeps its records up to the
+    checkpoint and continues it; a trace file with fewer records raises
+    ValueError.
+
+Dependencies
+    pygame is imported when display_init() is first called, so runs with
+    graphics_mode == 'off' do not need it. coinor.blimpy is only used by
+    the 'blimpy' calendar and queue types and is imported by load_blimpy()
+    when one of them is first created; if it is not installed, minimal heap
+    and deque based Queue and PriorityQueue classes are used instead.
+
 Global Constants
 Event Types
     ARRIVE = 0
@@ -158,6 +587,8 @@ Created on Feb 9, 2012
 Edited on Feb 11, 2013
 '''
 
+from __future__ import print_function
+
 __version__    = '1.0.0'
 __author__     = 'Aykut Bulut, Ted Ralphs (ayb211@lehigh.edu,ted@lehigh.edu)'
 __license__    = 'MIT'
@@ -165,12 +596,31 @@ __maintainer__ = 'Aykut Bulut'
 __email__      = 'ayb211@lehigh.edu'
 __title__      = 'M/M/s queueing system'
 
-from random import seed, expovariate
-from math import sqrt, pow
-import pygame
-from pygame.locals import QUIT
-from coinor.blimpy import Queue, PriorityQueue
-from random import random
+import os
+from random import Random
+from math import sqrt, log, tan, sin, asin, pi as PI
+from heapq import heappush, heappop
+from bisect import bisect_left
+from collections import deque
+from itertools import chain, count
+from functools import partial
+from array import array
+from time import time, sleep
+from Trace import TraceWriter
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+# coinor.blimpy Queue and PriorityQueue, loaded by load_blimpy()
+Queue = None
+PriorityQueue = None
+# pygame and its QUIT event type, loaded by display_init()
+pygame = None
+QUIT = None
+
+# array.tostring() is called tobytes() in Python 3
+_array_bytes = getattr(array, 'tobytes', None) or array.tostring
 
 # Event Types
 ARRIVE = 0
@@ -179,6 +629,131 @@ DEPART = 1
 IDLE = 0
 BUSY = 1
 
+# Coefficients of Acklam's rational approximation used in norm_quantile()
+_NQ_A = (-3.969683028665376e+01, 2.209460984245205e+02,
+         -2.759285104469687e+02, 1.383577518672690e+02,
+         -3.066479806614716e+01, 2.506628277459239e+00)
+_NQ_B = (-5.447609879822406e+01, 1.615858368580409e+02,
+         -1.556989798598866e+02, 6.680131188771972e+01,
+         -1.328068155288572e+01)
+_NQ_C = (-7.784894002430293e-03, -3.223964580411365e-01,
+         -2.400758277161838e+00, -2.549732539343734e+00,
+         4.374664141464968e+00, 2.938163982698783e+00)
+_NQ_D = (7.784695709041462e-03, 3.224671290700398e-01,
+         2.445134137142996e+00, 3.754408661907416e+00)
+
+
+class _Queue(object):
+    '''
+    Deque based stand-in for coinor.blimpy.Queue
+    '''
+    def __init__(self):
+        self.items = deque()
+
+    def isEmpty(self):
+        return len(self.items) == 0
+
+    def enqueue(self, item):
+        self.items.append(item)
+
+    def dequeue(self):
+        return self.items.popleft()
+
+    def size(self):
+        return len(self.items)
+
+
+class _PriorityQueue(object):
+    '''
+    Heap based stand-in for coinor.blimpy.PriorityQueue, items are their own
+    priorities and ties are broken by insertion order
+    '''
+    def __init__(self):
+        self.heap = []
+        self.counter = count()
+        self.size = 0
+
+    def isEmpty(self):
+        return self.size == 0
+
+    def push(self, key):
+        heappush(self.heap, (key, next(self.counter), key))
+        self.size += 1
+
+    def pop(self):
+        self.size -= 1
+        return heappop(self.heap)[-1]
+
+
+def load_blimpy():
+    '''
+    Imports Queue and PriorityQueue from coinor.blimpy on first call, falls
+    back to the built-in stand-ins if it is not installed
+    '''
+    global Queue, PriorityQueue
+    if Queue is None:
+        try:
+            from coinor.blimpy import Queue, PriorityQueue
+        except ImportError:
+            Queue, PriorityQueue = _Queue, _PriorityQueue
+
+
+def norm_quantile(p):
+    '''
+    Returns the p quantile of the standard normal distribution, 0 < p < 1.
+    Relative error is below 1.2e-9.
+    '''
+    a, b, c, d = _NQ_A, _NQ_B, _NQ_C, _NQ_D
+    if p < 0.02425:
+        q = sqrt(-2*log(p))
+        return ((((((c[0]*q+c[1])*q+c[2])*q+c[3])*q+c[4])*q+c[5]) /
+                ((((d[0]*q+d[1])*q+d[2])*q+d[3])*q+1))
+    if p > 1 - 0.02425:
+        return -norm_quantile(1 - p)
+    q = p - 0.5
+    r = q*q
+    return ((((((a[0]*r+a[1])*r+a[2])*r+a[3])*r+a[4])*r+a[5])*q /
+            (((((b[0]*r+b[1])*r+b[2])*r+b[3])*r+b[4])*r+1))
+
+
+def t_quantile(p, df):
+    '''
+    Returns the p quantile of Student's t distribution with df degrees of
+    freedom, 0 < p < 1.
+    '''
+    if df == 1:
+        return tan(PI*(p - 0.5))
+    if df == 2:
+        return (2*p - 1)/sqrt(2*p*(1 - p))
+    z = norm_quantile(p)
+    z2 = z*z
+    return (z + z*(z2 + 1)/(4.0*df) +
+            z*((5*z2 + 16)*z2 + 3)/(96.0*df**2) +
+            z*(((3*z2 + 19)*z2 + 17)*z2 - 15)/(384.0*df**3) +
+            z*((((79*z2 + 776)*z2 + 1482)*z2 - 1920)*z2 - 945)/
+            (92160.0*df**4))
+
+
+def substream_seeds(seedInput):
+    '''
+    Returns the seeds of the inter-arrival, service and routing streams
+    derived from seedInput
+    '''
+    master = Random(seedInput)
+    return tuple(master.getrandbits(32) for i in range(3))
+
+
+def half_width(stat, confidence = 0.95):
+    '''
+    Returns the half-width of the confidence interval on the mean of the
+    observations in RunningStat stat, inf if there are less than 2
+    observations.
+    '''
+    if stat.n < 2:
+        return float('inf')
+    return (t_quantile(0.5 + confidence/2.0, stat.n - 1) *
+            sqrt(stat.variance()/stat.n))
+
 
 class Event(object):
     '''
@@ -186,6 +761,8 @@ class Event(object):
     generate instances of arrival and departure events. See the file
     documentation for description of attributes.
     '''
+    __slots__ = ('number', 'eventType', 'eventTime', 'serverNumber')
+
     def __init__(self, eventType, eventNumber, eventTime, serverNumber = None):
         '''
         Constructor of the class. Input descriptions are same as in the
@@ -195,12 +772,17 @@ class Event(object):
         self.eventType = eventType
         self.eventTime = eventTime
         self.serverNumber = serverNumber
+        if eventType != ARRIVE and eventType != DEPART:
+            print("unknown event type")
+
+    @property
+    def name(self):
+        '''
+        Name of the event, 'arrival' or 'departure' followed by the number
+        '''
         if self.eventType == ARRIVE:
-            self.name = 'arrival'+str(self.number)
-        elif self.eventType == DEPART:
-            self.name = 'departure'+str(self.number)
-        else:
-            print "unknown event type"
+            return 'arrival'+str(self.number)
+        return 'departure'+str(self.number)
 
     def __gt__(self, other):
         '''
@@ -238,11 +820,499 @@ class Event(object):
         '''
         return self.eventTime != other.eventTime
 
+    # Defining __eq__ removes the default hash in Python 3, keep identity
+    # hashing as in Python 2, the blimpy calendar keeps events in a dict
+    __hash__ = object.__hash__
+
+class HeapEventTable(object):
+    '''
+    Event calendar based on a binary heap of plain tuples. See the file
+    documentation for description of attributes.
+    '''
+    __slots__ = ('heap',)
+
+    def __init__(self):
+        '''
+        Constructor of the class, starts with an empty heap.
+        '''
+        self.heap = []
+
+    def isEmpty(self):
+        '''
+        Returns True if there are no events in the calendar
+        '''
+        return len(self.heap) == 0
+
+    def push(self, eventType, eventNumber, eventTime, serverNumber = None):
+        '''
+        Inserts a new event to the calendar
+        '''
+        heappush(self.heap, (eventTime, eventNumber, eventType, serverNumber))
+
+    def pop(self):
+        '''
+        Removes and returns the earliest event as a tuple (eventTime,
+        eventNumber, eventType, serverNumber)
+        '''
+        return heappop(self.heap)
+
+    def size(self):
+        '''
+        Returns the number of events in the calendar
+        '''
+        return len(self.heap)
+
+
+class EventObjectTable(object):
+    '''
+    Event calendar that holds Event instances in a coinor.blimpy
+    PriorityQueue. See the file documentation for description.
+    '''
+    def __init__(self):
+        '''
+        Constructor of the class, starts with an empty priority queue.
+        '''
+        load_blimpy()
+        self.pq = PriorityQueue()
+
+    def isEmpty(self):
+        '''
+        Returns True if there are no events in the calendar
+        '''
+        return self.pq.isEmpty()
+
+    def push(self, eventType, eventNumber, eventTime, serverNumber = None):
+        '''
+        Inserts a new Event instance to the calendar
+        '''
+        self.pq.push(Event(eventType, eventNumber, eventTime, serverNumber))
+
+    def pop(self):
+        '''
+        Removes the earliest Event and returns it in the tuple layout of
+        HeapEventTable.pop()
+        '''
+        e = self.pq.pop()
+        return (e.eventTime, e.number, e.eventType, e.serverNumber)
+
+    def size(self):
+        '''
+        Returns the number of events in the calendar
+        '''
+        return self.pq.size
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, the event tuples in calendar order
+        '''
+        events = [self.pop() for i in range(self.size())]
+        for eventTime, number, eventType, serverNumber in events:
+            self.push(eventType, number, eventTime, serverNumber)
+        return {'events':events}
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled state
+        '''
+        self.__init__()
+        for eventTime, number, eventType, serverNumber in state['events']:
+            self.push(eventType, number, eventTime, serverNumber)
+
+
+# Event calendar backends that can be selected in EventQueue
+CALENDARS = {'heap':HeapEventTable,
+             'blimpy':EventObjectTable}
+
+
+class IndexedHeap(object):
+    '''
+    Min-heap of items 0,...,n-1 keyed by integers that supports changing
+    keys. See the file documentation for description of attributes.
+    '''
+    __slots__ = ('heap', 'pos', 'key')
+
+    def __init__(self, n):
+        '''
+        Constructor of the class, all n items start with key 0.
+        '''
+        self.heap = list(range(n))
+        self.pos = list(range(n))
+        self.key = [0]*n
+
+    def min(self):
+        '''
+        Returns the item with the smallest key, smallest index among ties
+        '''
+        return self.heap[0]
+
+    def increment(self, i):
+        '''
+        Increases the key of item i by 1
+        '''
+        self.key[i] += 1
+        self._sift_down(self.pos[i])
+
+    def decrement(self, i):
+        '''
+        Decreases the key of item i by 1
+        '''
+        self.key[i] -= 1
+        self._sift_up(self.pos[i])
+
+    def _less(self, a, b):
+        key = self.key
+        return key[a] < key[b] or (key[a] == key[b] and a < b)
+
+    def _sift_up(self, p):
+        heap, pos = self.heap, self.pos
+        item = heap[p]
+        while p > 0:
+            parent = (p - 1) >> 1
+            other = heap[parent]
+            if not self._less(item, other):
+                break
+            heap[p] = other
+            pos[other] = p
+            p = parent
+        heap[p] = item
+        pos[item] = p
+
+    def _sift_down(self, p):
+        heap, pos = self.heap, self.pos
+        n = len(heap)
+        item = heap[p]
+        while True:
+            child = 2*p + 1
+            if child >= n:
+                break
+            if child + 1 < n and self._less(heap[child + 1], heap[child]):
+                child += 1
+            other = heap[child]
+            if not self._less(other, item):
+                break
+            heap[p] = other
+            pos[other] = p
+            p = child
+        heap[p] = item
+        pos[item] = p
+
+
+class AliasTable(object):
+    '''
+    Alias table of a discrete distribution (Vose's method). See the file
+    documentation for description of attributes.
+    '''
+    __slots__ = ('n', 'prob', 'alias')
+
+    def __init__(self, weights):
+        '''
+        Constructor of the class, builds the table of the distribution
+        proportional to weights in O(n) time.
+        '''
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0 or min(weights) < 0:
+            raise ValueError('weights must be nonnegative with a positive sum')
+        scaled = [w*n/total for w in weights]
+        self.n = n
+        self.prob = [1.0]*n
+        self.alias = list(range(n))
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # Items left over have probability 1 up to rounding errors and keep
+        # prob 1.0
+
+    def sample(self, u):
+        '''
+        Returns the item drawn by the uniform(0,1) variate u, the integer
+        part of u*n picks a column and the fractional part decides between
+        the column and its alias
+        '''
+        x = u*self.n
+        i = int(x)
+        if i == self.n:
+            # u == 1.0, possible with antithetic uniforms
+            i -= 1
+        if x - i < self.prob[i]:
+            return i
+        return self.alias[i]
+
+
+class RunningStat(object):
+    '''
+    Online mean and variance accumulator. See the file documentation for
+    description of attributes.
+    '''
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        '''
+        Constructor of the class, starts with no observations.
+        '''
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        '''
+        Adds observation x
+        '''
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta/self.n
+        self.m2 += delta*(x - self.mean)
+
+    def variance(self):
+        '''
+        Returns the sample variance, 0 if there are less than 2 observations
+        '''
+        if self.n < 2:
+            return 0.0
+        return self.m2/(self.n - 1)
+
+    def stdev(self):
+        '''
+        Returns the sample standard deviation
+        '''
+        return sqrt(self.variance())
+
+
+class BatchMeans(object):
+    '''
+    Batch means with MSER warm-up deletion. See the file documentation for
+    description of attributes.
+    '''
+    def __init__(self, batches = 32, batch_size = 10):
+        '''
+        Constructor of the class, starts with no observations.
+        '''
+        self.batches = batches
+        self.batch_size = batch_size
+        self.means = []
+        self.completed = 0
+        self._sum = 0.0
+        self._count = 0
+
+    def add(self, x):
+        '''
+        Adds observation x
+        '''
+        self._sum += x
+        self._count += 1
+        if self._count == self.batch_size:
+            means = self.means
+            means.append(self._sum/self.batch_size)
+            self._sum = 0.0
+            self._count = 0
+            self.completed += 1
+            if len(means) == 2*self.batches:
+                self.means = [(means[i] + means[i+1])/2
+                              for i in range(0, len(means), 2)]
+                self.batch_size *= 2
+
+    def warmup(self):
+        '''
+        Returns the number of leading batches that minimizes the MSER
+        statistic, the sum of squared deviations of the remaining batch means
+        divided by the square of their number. At most half of the batches
+        are deleted.
+        '''
+        means = self.means
+        nb = len(means)
+        best, bestStat = 0, None
+        s1 = s2 = 0.0
+        # Suffix sums, from the last batch backwards
+        for d in range(nb - 1, -1, -1):
+            s1 += means[d]
+            s2 += means[d]*means[d]
+            n = nb - d
+            if d <= nb//2 and n > 1:
+                stat = (s2 - s1*s1/n)/(n*n)
+                if bestStat is None or stat <= bestStat:
+                    best, bestStat = d, stat
+        return best
+
+    def estimate(self, confidence = 0.95):
+        '''
+        Returns a tuple (mean, half-width, deleted batches, batches used)
+        '''
+        d = self.warmup()
+        stat = RunningStat()
+        for m in self.means[d:]:
+            stat.add(m)
+        return stat.mean, half_width(stat, confidence), d, stat.n
+
+    def correlation(self, d = 0):
+        '''
+        Returns the von Neumann statistic of the batch means after the first
+        d, their lag-1 autocorrelation standardized so that it is
+        approximately standard normal if the batch means are independent,
+        positive if they are positively correlated. Returns inf if there are
+        less than 3 batch means and 0 if they are all equal, as when no
+        customer waits.
+        '''
+        means = self.means[d:]
+        n = len(means)
+        if n < 3:
+            return float('inf')
+        mean = sum(means)/float(n)
+        ss = sum((m - mean)**2 for m in means)
+        if ss == 0:
+            return 0.0
+        diff = sum((means[i+1] - means[i])**2 for i in range(n - 1))
+        return (1 - diff/(2*ss))/sqrt((n - 2)/float(n*n - 1))
+
+
+class QuantileSketch(object):
+    '''
+    Mergeable quantile sketch of a sequence of observations (merging
+    t-digest). See the file documentation for description of attributes.
+    '''
+    def __init__(self, compression = 200, buffer_size = 2000):
+        '''
+        Constructor of the class, starts with no observations.
+        '''
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.n = 0
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, x):
+        '''
+        Adds observation x
+        '''
+        buffer = self.buffer
+        buffer.append(x)
+        if len(buffer) >= self.buffer_size:
+            self._compress()
+
+    def merge(self, other):
+        '''
+        Adds the observations summarized by QuantileSketch other
+        '''
+        other._compress()
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(list(zip(other.means, other.weights)))
+
+    def quantile(self, q):
+        '''
+        Returns the estimated q quantile, None if there are no observations
+        '''
+        self._compress()
+        means, weights = self.means, self.weights
+        if not means:
+            return None
+        t = q*self.n
+        # Centroid i stands for weights[i] observations centered at its
+        # cumulative weight plus weights[i]/2, values are interpolated
+        # between centers and towards min and max at the ends
+        left = weights[0]/2.0
+        if t <= left:
+            return self.min + (means[0] - self.min)*t/left
+        cum = 0.0
+        for i in range(len(means) - 1):
+            lo = cum + weights[i]/2.0
+            hi = cum + weights[i] + weights[i+1]/2.0
+            if t <= hi:
+                return means[i] + (means[i+1] - means[i])*(t - lo)/(hi - lo)
+            cum += weights[i]
+        right = weights[-1]/2.0
+        return means[-1] + (self.max - means[-1])*min(1.0, (t - cum - right)/
+                                                       right)
+
+    def _limit(self, q):
+        '''
+        Returns the largest quantile that a centroid starting at quantile q
+        may reach, one unit of the scale function
+        k(q) = compression*asin(2q - 1)/(2 pi) further
+        '''
+        k = self.compression*asin(2*q - 1)/(2*PI) + 1
+        if k >= self.compression/4.0:
+            return 1.0
+        return (sin(2*PI*k/self.compression) + 1)/2
+
+    def _compress(self, extra = ()):
+        '''
+        Merges the buffered observations and the (mean, weight) pairs extra
+        into the centroids. Runs of buffered observations that fall between
+        two centroids are summed with slices, so the Python-level work is
+        proportional to the number of centroids rather than observations.
+        '''
+        buffer = self.buffer
+        if not buffer and not extra:
+            return
+        if buffer:
+            buffer.sort()
+            self.min = min(self.min, buffer[0])
+            self.max = max(self.max, buffer[-1])
+        centroids = list(zip(self.means, self.weights))
+        if extra:
+            centroids = sorted(centroids + list(extra))
+        total = float(self.n + len(buffer) + sum(w for m, w in extra))
+        means = []
+        weights = []
+        nb, nc = len(buffer), len(centroids)
+        i = j = 0
+        # Weighted sum and weight of the open centroid, weight of the closed
+        # ones and the weight the open centroid may reach
+        s = 0.0
+        w = 0
+        before = 0
+        limit = self._limit(0.0)*total
+        while i < nb or j < nc:
+            centroid = j < nc and (i == nb or centroids[j][0] <= buffer[i])
+            if centroid:
+                m, take = centroids[j]
+            else:
+                end = bisect_left(buffer, centroids[j][0], i) if j < nc else nb
+                # An empty centroid takes at least one observation
+                take = min(max(int(limit - before - w), 0 if w else 1),
+                           end - i)
+            if w and (take == 0 or before + w + take > limit):
+                means.append(s/w)
+                weights.append(w)
+                before += w
+                limit = self._limit(before/total)*total
+                s = 0.0
+                w = 0
+            elif centroid:
+                s += m*take
+                w += take
+                j += 1
+            else:
+                s += sum(buffer[i:i+take])
+                w += take
+                i += take
+        means.append(s/w)
+        weights.append(w)
+        self.buffer = []
+        self.means = means
+        self.weights = weights
+        self.n = int(total)
+
+
 class Customer(object):
     '''
     Customer class. A basic class with only constructor method and 3
     attributes.
     '''
+    __slots__ = ('entryTime', 'serviceTime', 'number')
+
     def  __init__(self, entryTime, serviceTime, customerNumber):
         '''
         Initializes class attributes. See module documentation for explanation
@@ -253,45 +1323,524 @@ class Customer(object):
         self.number = customerNumber
 
 
+class CustomerRingBuffer(object):
+    '''
+    FIFO queue of customers in parallel typed arrays. See the file
+    documentation for description of attributes.
+    '''
+    __slots__ = ('entryTime', 'serviceTime', 'number', 'head', 'count',
+                 'mask')
+
+    def __init__(self, capacity = 16):
+        '''
+        Constructor of the class, capacity is rounded up to a power of 2.
+        '''
+        size = 1
+        while size < capacity:
+            size *= 2
+        self.entryTime = array('d', [0.0])*size
+        self.serviceTime = array('d', [0.0])*size
+        self.number = array('l', [0])*size
+        self.head = 0
+        self.count = 0
+        self.mask = size - 1
+
+    def isEmpty(self):
+        '''
+        Returns True if the queue is empty
+        '''
+        return self.count == 0
+
+    def enqueue(self, entryTime, serviceTime, number):
+        '''
+        Inserts a customer at the end of the queue
+        '''
+        if self.count > self.mask:
+            self._grow()
+        i = (self.head + self.count) & self.mask
+        self.entryTime[i] = entryTime
+        self.serviceTime[i] = serviceTime
+        self.number[i] = number
+        self.count += 1
+
+    def dequeue(self):
+        '''
+        Removes the first customer and returns the tuple (entryTime,
+        serviceTime, number)
+        '''
+        i = self.head
+        self.head = (i + 1) & self.mask
+        self.count -= 1
+        return self.entryTime[i], self.serviceTime[i], self.number[i]
+
+    def size(self):
+        '''
+        Returns the number of customers in the queue
+        '''
+        return self.count
+
+    def _grow(self):
+        '''
+        Doubles the capacity, moving the customers to the front of the arrays
+        '''
+        h = self.head
+        size = self.mask + 1
+        for name in ('entryTime', 'serviceTime', 'number'):
+            a = getattr(self, name)
+            setattr(self, name, a[h:] + a[:h] + a)
+        self.head = 0
+        self.mask = 2*size - 1
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, the capacity and the raw bytes of the
+        arrays holding the customers in queue order
+        '''
+        h, n = self.head, self.count
+        state = [self.mask + 1]
+        for a in (self.entryTime, self.serviceTime, self.number):
+            state.append(_array_bytes((a[h:] + a[:h])[:n]))
+        return tuple(state)
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled state
+        '''
+        self.__init__(state[0])
+        for name, s in zip(('entryTime', 'serviceTime', 'number'), state[1:]):
+            a = getattr(self, name)
+            self.count = len(s)//a.itemsize
+            a[:self.count] = array(a.typecode, s)
+
+
+class CustomerObjectQueue(object):
+    '''
+    FIFO queue of Customer instances in a coinor.blimpy Queue. See the file
+    documentation for description.
+    '''
+    def __init__(self):
+        '''
+        Constructor of the class, starts with an empty queue.
+        '''
+        load_blimpy()
+        self.queue = Queue()
+
+    def isEmpty(self):
+        '''
+        Returns True if the queue is empty
+        '''
+        return self.queue.isEmpty()
+
+    def enqueue(self, entryTime, serviceTime, number):
+        '''
+        Inserts a new Customer instance at the end of the queue
+        '''
+        self.queue.enqueue(Customer(entryTime, serviceTime, number))
+
+    def dequeue(self):
+        '''
+        Removes the first Customer and returns it in the tuple layout of
+        CustomerRingBuffer.dequeue()
+        '''
+        c = self.queue.dequeue()
+        return c.entryTime, c.serviceTime, c.number
+
+    def size(self):
+        '''
+        Returns the number of customers in the queue
+        '''
+        return self.queue.size()
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, the customer tuples in queue order
+        '''
+        customers = [self.dequeue() for i in range(self.size())]
+        for c in customers:
+            self.enqueue(*c)
+        return {'customers':customers}
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled state
+        '''
+        self.__init__()
+        for c in state['customers']:
+            self.enqueue(*c)
+
+
+# Queue types that can be selected in EventQueue
+QUEUE_TYPES = {'compact':CustomerRingBuffer,
+               'blimpy':CustomerObjectQueue}
+
+
+def _antithetic_expovariate(random, mean):
+    '''
+    Returns the exponential variate with the given mean obtained from 1 - U
+    instead of U, random.expovariate() computes -log(1 - U)*mean
+    '''
+    # U == 0 has probability 2**-53, avoid log(0)
+    return -mean*log(random() or 1.0)
+
+
+def _antithetic_uniform(random):
+    '''
+    Returns 1 - U
+    '''
+    return 1.0 - random()
+
+
+class PythonVariates(object):
+    '''
+    Random variates drawn one at a time from random.Random instances. See
+    the file documentation for description of attributes.
+    '''
+    def __init__(self, seedInput, IAT, ST, streams = 'shared',
+                 antithetic = False):
+        '''
+        Constructor of the class, IAT and ST are the means of the
+        exponential inter-arrival and service times.
+        '''
+        if streams == 'shared':
+            rng = Random(seedInput)
+            self.rngs = (rng, rng, rng)
+        elif streams == 'separate':
+            self.rngs = tuple(Random(s) for s in substream_seeds(seedInput))
+        else:
+            raise ValueError('unknown streams %s' % streams)
+        self.IAT = IAT
+        self.ST = ST
+        self.antithetic = antithetic
+        self._bind()
+
+    def _bind(self):
+        '''
+        Builds interarrival, service and uniform on top of rngs
+        '''
+        arrival, service, routing = self.rngs
+        if self.antithetic:
+            self.interarrival = partial(_antithetic_expovariate,
+                                        arrival.random, self.IAT)
+            self.service = partial(_antithetic_expovariate,
+                                   service.random, self.ST)
+            self.uniform = partial(_antithetic_uniform, routing.random)
+        else:
+            self.interarrival = partial(arrival.expovariate, 1.0/self.IAT)
+            self.service = partial(service.expovariate, 1.0/self.ST)
+            self.uniform = routing.random
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, the generators and the parameters
+        '''
+        return {'rngs':self.rngs, 'IAT':self.IAT, 'ST':self.ST,
+                'antithetic':self.antithetic}
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled state
+        '''
+        self.__dict__.update(state)
+        self._bind()
+
+
+def _pending(buffers):
+    '''
+    Returns the variates not handed out yet of each (sequence, iterator) pair
+    in buffers
+    '''
+    return [array('d', s[len(s) - it.__length_hint__():])
+            for s, it in buffers]
+
+
+class NumpyVariates(object):
+    '''
+    Random variates generated in blocks by numpy. See the file documentation
+    for description.
+    '''
+    def __init__(self, seedInput, IAT, ST, block_size = 65536,
+                 streams = 'shared', antithetic = False):
+        '''
+        Constructor of the class, IAT and ST are the means of the
+        exponential inter-arrival and service times.
+        '''
+        import numpy
+        if streams == 'shared':
+            rng = numpy.random.RandomState(seedInput)
+            self.rngs = (rng, rng, rng)
+        elif streams == 'separate':
+            self.rngs = tuple(numpy.random.RandomState(s)
+                              for s in substream_seeds(seedInput))
+        else:
+            raise ValueError('unknown streams %s' % streams)
+        self.IAT = IAT
+        self.ST = ST
+        self.antithetic = antithetic
+        self.block_size = block_size
+        self._bind(([], [], []))
+
+    def _bind(self, pending):
+        '''
+        Builds interarrival, service and uniform on top of rngs, the streams
+        first hand out the variates in pending and then draw new blocks
+        '''
+        import numpy
+        arrival, service, routing = self.rngs
+        IAT, ST = self.IAT, self.ST
+        if self.antithetic:
+            # RandomState.exponential computes -log(1 - U)*mean
+            draws = (lambda size: -IAT*numpy.log(arrival.random_sample(size)),
+                     lambda size: -ST*numpy.log(service.random_sample(size)),
+                     lambda size: 1.0 - routing.random_sample(size))
+        else:
+            draws = (partial(arrival.exponential, IAT),
+                     partial(service.exponential, ST),
+                     routing.random_sample)
+        # Current (block, iterator) of each stream
+        self.buffers = [None]*3
+        self.interarrival, self.service, self.uniform = [
+            self._stream(k, draws[k], list(pending[k])) for k in range(3)]
+
+    def _stream(self, k, draw, pending):
+        '''
+        Returns a callable handing out the variates of pending and then of
+        draw(size) one by one, refilling its buffer block_size variates at a
+        time. The current buffer is kept in buffers[k].
+        '''
+        size = self.block_size
+        buffers = self.buffers
+        def refill():
+            block = draw(size).tolist()
+            buffers[k] = (block, iter(block))
+            return buffers[k][1]
+        buffers[k] = (pending, iter(pending))
+        blocks = chain((buffers[k][1],), iter(refill, None))
+        return partial(next, chain.from_iterable(blocks))
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, the generators, the parameters and the
+        buffered variates
+        '''
+        return {'rngs':self.rngs, 'IAT':self.IAT, 'ST':self.ST,
+                'antithetic':self.antithetic, 'block_size':self.block_size,
+                'pending':_pending(self.buffers)}
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled state
+        '''
+        pending = state.pop('pending')
+        self.__dict__.update(state)
+        self._bind(pending)
+
+
+class ArrayVariates(object):
+    '''
+    Random variates replayed from given sequences. See the file
+    documentation for description.
+    '''
+    def __init__(self, interarrival, service, uniform = ()):
+        '''
+        Constructor of the class, inputs are sequences of variates. Drawing
+        past the end of a sequence raises StopIteration.
+        '''
+        self._bind((interarrival, service, uniform))
+
+    def _bind(self, sequences):
+        '''
+        Builds interarrival, service and uniform replaying sequences
+        '''
+        self.buffers = [(s, iter(s)) for s in map(list, sequences)]
+        self.interarrival, self.service, self.uniform = [
+            partial(next, it) for s, it in self.buffers]
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, the variates not replayed yet
+        '''
+        return {'pending':_pending(self.buffers)}
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled state
+        '''
+        self._bind(state['pending'])
+
+
+# Random variate sources that can be selected in EventQueue
+VARIATES = {'python':PythonVariates,
+            'numpy':NumpyVariates}
+
+
+class Instrumentation(object):
+    '''
+    Timing and counting wrappers around the hot methods of an EventQueue.
+    See the file documentation for description of attributes.
+    '''
+    TIMED = ('which_queue', 'add_event', 'get_event')
+
+    def __init__(self, eq, callback = None, interval = 1.0):
+        '''
+        Constructor of the class, attaches the wrappers to EventQueue eq.
+        '''
+        self.eq = eq
+        self.callback = callback
+        self.interval = interval
+        self.start = time()
+        self.nextReport = self.start + interval
+        self.events = 0
+        self.counts = {ARRIVE:0, DEPART:0}
+        self.seconds = dict((name, 0.0) for name in self.TIMED)
+        for name in self.TIMED:
+            setattr(eq, name, self._timed(name, getattr(eq, name)))
+        eq.process_event = self._counted(eq.process_event)
+
+    def _timed(self, name, method):
+        '''
+        Returns method wrapped to add its running time to seconds[name]
+        '''
+        seconds = self.seconds
+        def timed(*args):
+            start = time()
+            result = method(*args)
+            seconds[name] += time() - start
+            return result
+        return timed
+
+    def _counted(self, method):
+        '''
+        Returns process_event wrapped to count events and call the callback
+        '''
+        counts = self.counts
+        def counted(event):
+            method(event)
+            counts[event[2]] += 1
+            self.events += 1
+            # Check the clock every 1024 events only
+            if (self.callback is not None and not self.events & 1023 and
+                time() >= self.nextReport):
+                self.nextReport = time() + self.interval
+                self.callback(self.snapshot())
+        return counted
+
+    def snapshot(self):
+        '''
+        Returns a dictionary describing the run so far
+        '''
+        elapsed = time() - self.start
+        return {'events':self.events,
+                'elapsed':elapsed,
+                'eventsPerSecond':self.events/elapsed if elapsed else 0.0,
+                'counts':{'arrival':self.counts[ARRIVE],
+                          'departure':self.counts[DEPART]},
+                'seconds':dict(self.seconds),
+                'simulationTime':self.eq.currentTime}
+
+    def detach(self):
+        '''
+        Removes the wrappers from the EventQueue
+        '''
+        for name in self.TIMED + ('process_event',):
+            delattr(self.eq, name)
+
+
 class EventQueue(object):
     '''
     This class holds the attributes and methods for the simulation of M/M/s
     queueing system
     '''
+    # Attributes that are not saved by checkpoint(): open files, wrappers
+    # and pygame objects
+    TRANSIENT = (('trace', 'instrumentation', 'screen', 'background',
+                  'clock', 'process_event') + Instrumentation.TIMED)
+
     def __init__(self, seedInput = 0, IAT = 3, ST = 8, pi = None,
                  server_num = 3, queueing_mode = 'shortest',
-                 graphics_mode = 'off'):
+                 graphics_mode = 'off', calendar = 'heap',
+                 keep_records = False, variates = 'python',
+                 block_size = 65536, queue_type = 'compact', framerate = 100,
+                 time_warp = None, trace = None, streams = 'shared',
+                 antithetic = False, choices = 2):
         '''
         Constructor of the class, sets initial values for class attributes
-        Post: self.ii, self.seed, self.IAT, self.ST, self.currentTime,
-        self.eventTable, self.waitingTime, self.TIS, self.serviceTime,
-        self.eventCounter, self.customerCounter, self.server, self.sqList
-        self.pi
+        Post: self.ii, self.seed, self.variates, self.IAT, self.ST,
+        self.currentTime,
+        self.calendar, self.eventTable, self.waitingTime, self.TIS,
+        self.serviceTime, self.keep_records, self.waitStat,
+        self.serviceStat, self.TISStat, self.waitSketch, self.waitBatches,
+        self.TISBatches, self.eventCounter,
+        self.customerCounter,
+        self.framerate, self.time_warp, self.trace, self.numWaiting,
+        self.numBusy, self.waitingArea, self.busyArea, self.busyTime,
+        self.busyStart, self.instrumentation, self.server, self.queue_type,
+        self.sqList, self.pi, self.alias, self.choices, self.freeServers,
+        self.queueLength
         '''
         self.ii = 0
-        seed(seedInput)
         self.seed = seedInput
         self.IAT = IAT
         self.ST = ST
+        if variates == 'python':
+            self.variates = PythonVariates(seedInput, IAT, ST, streams,
+                                           antithetic)
+        elif variates == 'numpy':
+            self.variates = NumpyVariates(seedInput, IAT, ST, block_size,
+                                          streams, antithetic)
+        elif hasattr(variates, 'interarrival'):
+            self.variates = variates
+        else:
+            raise ValueError('unknown variates %s' % variates)
         self.currentTime = 0.0
-        self.eventTable = PriorityQueue()
+        if calendar not in CALENDARS:
+            raise ValueError('unknown calendar %s' % calendar)
+        self.calendar = calendar
+        self.eventTable = CALENDARS[calendar]()
         # waiting time of customers
         self.waitingTime = {}
         # time in system for each customer
         self.TIS = {}
         # service time for the corresponding customer
         self.serviceTime = {}
+        self.keep_records = keep_records
+        self.waitStat = RunningStat()
+        self.serviceStat = RunningStat()
+        self.TISStat = RunningStat()
+        self.waitSketch = QuantileSketch()
+        self.waitBatches = None
+        self.TISBatches = None
         self.eventCounter = 0
         self.customerCounter = 0
         self.set_mode(server_num, queueing_mode, graphics_mode)
+        self.framerate = framerate
+        self.time_warp = time_warp
+        if isinstance(trace, str):
+            trace = TraceWriter(trace)
+        self.trace = trace
         self.server = [IDLE for i in range(self.server_num)]
-        self.sqList = [Queue() for i in range(self.queue_num)]
-        # Equal probabilities by default
-        if pi == None:
-            pi = [1/float(self.queue_num) for i in range(self.queue_num)]
-        #Ensure the probabilities sum to one
-        pi[self.queue_num - 1] = 1 - sum(pi[:self.queue_num-1])
-        self.pi = pi
+        self.numWaiting = 0
+        self.numBusy = 0
+        self.waitingArea = 0.0
+        self.busyArea = 0.0
+        self.busyTime = [0.0]*self.server_num
+        self.busyStart = [0.0]*self.server_num
+        self.instrumentation = None
+        self.freeServers = None
+        self.queueLength = None
+        if self.queueing_mode == 'single':
+            # Lowest index first, same order as a linear scan of self.server
+            self.freeServers = list(range(self.server_num))
+        elif self.queueing_mode == 'shortest':
+            self.queueLength = IndexedHeap(self.queue_num)
+        if queue_type not in QUEUE_TYPES:
+            raise ValueError('unknown queue type %s' % queue_type)
+        self.queue_type = queue_type
+        self.sqList = [QUEUE_TYPES[queue_type]()
+                       for i in range(self.queue_num)]
+        self.set_pi(pi)
+        if choices < 1:
+            raise ValueError('choices must be at least 1')
+        self.choices = choices
         # Add first arrival event
         self.add_event(ARRIVE, self.currentTime)
 
@@ -299,7 +1848,8 @@ class EventQueue(object):
                  graphics_mode = None):
         '''
         server_num is a positive integer queueing_mode is either 'single',
-        'random', or 'shortest' graphics_mode is either string 'off' or 'on'
+        'random', or 'shortest' graphics_mode is either string 'off', 'on' or
+        'live'
         '''
         if queueing_mode:
             self.queueing_mode = queueing_mode
@@ -311,43 +1861,80 @@ class EventQueue(object):
                 self.queue_num = 1
         if graphics_mode:
             self.graphics_mode = graphics_mode
-        if graphics_mode == 'on' and self.server_num > 50:
-            print 'Only visualizing first 50 servers'
+        if graphics_mode in ('on', 'live') and self.server_num > 50:
+            print('Only visualizing first 50 servers')
+
+    def set_pi(self, pi = None):
+        '''
+        Sets the routing probabilities of 'random' mode and rebuilds the
+        alias table. pi defaults to equal probabilities, its last entry is
+        set so that the probabilities sum to one.
+        '''
+        # Equal probabilities by default
+        if pi == None:
+            pi = [1/float(self.queue_num) for i in range(self.queue_num)]
+        if len(pi) != self.queue_num:
+            raise ValueError('pi needs %d probabilities' % self.queue_num)
+        pi = list(pi)
+        #Ensure the probabilities sum to one
+        pi[self.queue_num - 1] = 1 - sum(pi[:self.queue_num-1])
+        self.pi = pi
+        self.alias = AliasTable(pi)
 
     def process_event(self, event):
         '''
-        processes event given and updates sqList and eventTable accordingly
+        processes event given and updates sqList and eventTable accordingly,
+        event is a tuple (eventTime, eventNumber, eventType, serverNumber)
         '''
-        if event.eventType == ARRIVE: 
+        eventType, serverNumber = event[2], event[3]
+        if eventType == ARRIVE:
             whichQueue, whichServer = self.which_queue()
-            serviceTime = expovariate(1.0/self.ST)
+            serviceTime = self.variates.service()
             if whichServer == None:
-                self.sqList[whichQueue].enqueue(Customer(self.currentTime, 
-                                                         serviceTime, 
-                                                         self.customerCounter))
+                self.sqList[whichQueue].enqueue(self.currentTime, serviceTime,
+                                                self.customerCounter)
+                self.numWaiting += 1
             else:
-                self.waitingTime[self.customerCounter] = 0
-                self.serviceTime[self.customerCounter] = serviceTime
+                self.numBusy += 1
+                self.busyStart[whichServer] = self.currentTime
+                self.record_service(self.customerCounter, 0, serviceTime)
                 self.add_event(DEPART, self.currentTime + serviceTime, 
                                whichServer)
+            if self.trace is not None:
+                self.trace.write(self.currentTime, ARRIVE,
+                                 self.customerCounter, whichServer,
+                                 whichQueue, self.sqList[whichQueue].size())
             self.customerCounter += 1
-            self.add_event(ARRIVE, self.currentTime+expovariate(1.0/self.IAT))
-        elif event.eventType == DEPART:
+            self.add_event(ARRIVE,
+                           self.currentTime + self.variates.interarrival())
+        elif eventType == DEPART:
             if self.queue_num == 1:
-                q = self.sqList[0]
+                queue = 0
             else:
-                q = self.sqList[event.serverNumber]
+                queue = serverNumber
+            q = self.sqList[queue]
+            if self.queueLength is not None:
+                self.queueLength.decrement(serverNumber)
             if not q.isEmpty():
-                customer = q.dequeue()
-                self.waitingTime[customer.number] = (self.currentTime - 
-                                                     customer.entryTime)
-                self.serviceTime[customer.number] = customer.serviceTime
-                self.add_event(DEPART, self.currentTime + customer.serviceTime,
-                               event.serverNumber)
+                entryTime, serviceTime, number = q.dequeue()
+                self.numWaiting -= 1
+                self.record_service(number, self.currentTime - entryTime,
+                                    serviceTime)
+                self.add_event(DEPART, self.currentTime + serviceTime,
+                               serverNumber)
             else:
-                self.server[event.serverNumber] = IDLE
+                number = -1
+                self.numBusy -= 1
+                self.busyTime[serverNumber] += (self.currentTime -
+                                                self.busyStart[serverNumber])
+                self.server[serverNumber] = IDLE
+                if self.freeServers is not None:
+                    heappush(self.freeServers, serverNumber)
+            if self.trace is not None:
+                self.trace.write(self.currentTime, DEPART, number,
+                                 serverNumber, queue, q.size())
         else:
-            print "Unknown event type"
+            print("Unknown event type")
             
     def which_queue(self):
         '''
@@ -356,84 +1943,397 @@ class EventQueue(object):
         represents the queue that the customer should join and server is one of
         the available servers if there is no available server, server value
         returned is None
+        In 'shortest' mode the customer joins the station with the fewest
+        customers, counting the one in service. In 'random' mode the station
+        is drawn from the alias table of pi and in 'power-of-d' mode it is
+        the station with the fewest customers among choices stations
+        sampled uniformly, ties going to the first one sampled.
         '''
         # Single server policy
         if self.queueing_mode == 'single':
-            if self.sqList[0].isEmpty():
-                for i in range(self.server_num):
-                    if self.server[i] == IDLE:
-                        self.server[i] = BUSY
-                        return 0, i
-            else:
-                return 0, None
+            if self.sqList[0].isEmpty() and self.freeServers:
+                i = heappop(self.freeServers)
+                self.server[i] = BUSY
+                return 0, i
             return 0, None
-        # COMPLETE CHOOSING RANDOM QUEUE
         elif self.queueing_mode == 'random':
-            pass
-        # COMPLETE CHOOSING SHORTEST QUEUE
+            i = self.alias.sample(self.variates.uniform())
+        elif self.queueing_mode == 'power-of-d':
+            uniform = self.variates.uniform
+            n = self.queue_num
+            i = best = None
+            for k in range(self.choices):
+                j = int(uniform()*n)
+                if j == n:
+                    # uniform() == 1.0, possible with antithetic uniforms
+                    j -= 1
+                # Customers waiting plus the one in service
+                length = self.sqList[j].size() + (self.server[j] == BUSY)
+                if best is None or length < best:
+                    i, best = j, length
         elif self.queueing_mode == 'shortest':
-            pass
+            i = self.queueLength.min()
+            self.queueLength.increment(i)
+        else:
+            raise ValueError('unknown queueing mode %s' % self.queueing_mode)
+        if self.server[i] == IDLE:
+            self.server[i] = BUSY
+            return i, i
+        return i, None
 
-    def simulate(self, simulationLength):
+    def simulate(self, simulationLength, checkpoint_path = None,
+                 checkpoint_interval = 10.0):
         '''
-        Simulates the system for simulationLength time units
+        Simulates the system until time simulationLength. Calling it again
+        with a larger simulationLength continues the run. If checkpoint_path
+        is given, a checkpoint is written there about every
+        checkpoint_interval wall-clock seconds and at the end of the run,
+        this requires graphics_mode == 'off'.
         '''
-        pgEventType = None
-        if self.graphics_mode == 'on':
+        running = True
+        if checkpoint_path is not None:
+            if self.graphics_mode != 'off':
+                raise ValueError('checkpoints need graphics_mode off')
+            self.simulate_checkpointed(simulationLength, checkpoint_path,
+                                       checkpoint_interval)
+            running = False
+        elif self.graphics_mode == 'live':
+            self.simulate_live(simulationLength)
+            running = False
+        elif self.graphics_mode == 'on':
             self.display_init()
-        while self.currentTime < simulationLength and pgEventType != QUIT:
+        while self.currentTime < simulationLength and running:
             if self.graphics_mode == 'on':
                 for pgEvent in pygame.event.get():
-                    pgEventType = pgEvent.type
+                    if pgEvent.type == QUIT:
+                        running = False
                 self.clock.tick(self.framerate)
                 self.draw_screen()
                 self.screen.blit(self.background, (0,0))
                 pygame.display.flip()
             event = self.get_event()
             self.process_event(event)
+        if self.trace is not None:
+            self.trace.flush()
+
+    def step(self, n = 1):
+        '''
+        Processes the next n events and returns snapshot()
+        '''
+        while n > 0:
+            self.process_event(self.get_event())
+            n -= 1
+        return self.snapshot()
+
+    def run_until(self, simulationLength, batch = 1024):
+        '''
+        Generator that simulates the system until time simulationLength in
+        batches of at most batch events, yielding snapshot() after each
+        batch. Small batches return control to the caller more often, large
+        ones spend less time outside the event loop. The run ends at the
+        same event as simulate(simulationLength).
+        '''
+        while self.currentTime < simulationLength:
+            n = batch
+            while n > 0 and self.currentTime < simulationLength:
+                self.process_event(self.get_event())
+                n -= 1
+            yield self.snapshot()
+
+    def snapshot(self):
+        '''
+        Returns a dictionary describing the state of the run, get_stat()
+        plus the keys
+        'currentTime':        simulation time
+        'customers':          number of customers arrived
+        'numWaiting':         number of customers waiting
+        'numBusy':            number of busy servers
+        'queueLength':        average number of customers waiting so far
+        'utilization':        average fraction of busy servers so far
+        '''
+        T = self.currentTime
+        result = self.get_stat()
+        result.update({'currentTime':T,
+                       'customers':self.customerCounter,
+                       'numWaiting':self.numWaiting,
+                       'numBusy':self.numBusy,
+                       'queueLength':self.waitingArea/T if T > 0 else 0.0,
+                       'utilization':(self.busyArea/(T*self.server_num)
+                                      if T > 0 else 0.0)})
+        return result
+
+    def simulate_checkpointed(self, simulationLength, path, interval):
+        '''
+        Simulates the system until time simulationLength, writing a
+        checkpoint to path about every interval wall-clock seconds and at
+        the end of the run
+        '''
+        nextCheckpoint = time() + interval
+        n = 0
+        while self.currentTime < simulationLength:
+            self.process_event(self.get_event())
+            n += 1
+            # Check the clock every 1024 events only
+            if not n & 1023 and time() >= nextCheckpoint:
+                self.checkpoint(path)
+                nextCheckpoint = time() + interval
+        self.checkpoint(path)
+
+    def checkpoint(self, path):
+        '''
+        Writes the state of the simulation to the file path, see restore().
+        The file is replaced atomically, so an interrupted checkpoint leaves
+        the previous one intact.
+        '''
+        if self.trace is not None:
+            self.trace.flush()
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        getattr(os, 'replace', os.rename)(tmp, path)
+
+    def __getstate__(self):
+        '''
+        Returns the state to pickle, without the TRANSIENT attributes and with
+        the number of trace records written, see restore()
+        '''
+        state = dict(self.__dict__)
+        for name in self.TRANSIENT:
+            state.pop(name, None)
+        state['trace'] = None
+        state['instrumentation'] = None
+        if self.trace is not None:
+            state['traceRecords'] = self.trace.records
+        return state
+
+    def simulate_live(self, simulationLength):
+        '''
+        Simulates the system for simulationLength time units in 'live'
+        graphics mode. Events are processed at full speed, or so that
+        time_warp simulated time units pass per wall-clock second, and the
+        changed parts of the screen are redrawn framerate times a second.
+        '''
+        self.display_init()
+        self.draw_screen()
+        self.screen.blit(self.background, (0,0))
+        pygame.display.flip()
+        period = 1.0/self.framerate
+        wallStart = time()
+        simStart = self.currentTime
+        nextFrame = wallStart + period
+        running = True
+        while self.currentTime < simulationLength and running:
+            target = simulationLength
+            if self.time_warp is not None:
+                target = min(target, simStart +
+                             (nextFrame - wallStart)*self.time_warp)
+            n = 0
+            # Check the clock every 64 events only
+            while self.currentTime < target:
+                self.process_event(self.get_event())
+                n += 1
+                if not n & 63 and time() >= nextFrame:
+                    break
+            now = time()
+            if now < nextFrame:
+                sleep(nextFrame - now)
+            for pgEvent in pygame.event.get():
+                if pgEvent.type == QUIT:
+                    running = False
+            self.draw_changes()
+            nextFrame += period
+            # Drop frames rather than falling further behind
+            if nextFrame < time():
+                nextFrame = time() + period
+
+    def simulate_precision(self, precision = 0.05, maxLength = float('inf'),
+                           confidence = 0.95, batches = 512,
+                           independence = 0.05):
+        '''
+        Simulates until the relative half-width of the confidence intervals
+        on mean waiting time and time in system is at most precision or
+        until time maxLength. The intervals are computed with batch means
+        after deleting the warm-up period by the MSER rule and they are
+        checked each time a batch is completed, once at least batches
+        batches are available. An interval is only accepted if the von
+        Neumann test at level independence does not reject the independence
+        of the remaining batch means; while it does, batches are too short
+        for the interval to be valid and the run goes on, doubling them.
+        Waiting times at high load are strongly correlated, so the test
+        needs many batches to have power, hence the default of 512.
+        Returns a dictionary with keys
+        'converged':   True if the precision was reached
+        'events':      number of events processed in this call
+        'customers':   number of customers that started service in this
+                       call
+        'time':        simulation time at which the run stopped
+        'warmup':      number of customers deleted as warm-up
+        'batch_size':  customers per batch
+        'waitingTime': (mean, half-width) of waiting time
+        'TIS':         (mean, half-width) of time in system
+        Graphics are not shown in this mode.
+        '''
+        self.waitBatches = BatchMeans(batches)
+        self.TISBatches = BatchMeans(batches)
+        tisBatches = self.TISBatches
+        critical = norm_quantile(1 - independence)
+        customers = self.TISStat.n
+        events = 0
+        checked = 0
+        converged = False
+        while self.currentTime < maxLength:
+            self.process_event(self.get_event())
+            events += 1
+            if tisBatches.completed != checked:
+                checked = tisBatches.completed
+                if len(tisBatches.means) < batches:
+                    continue
+                w = self.waitBatches.estimate(confidence)
+                t = tisBatches.estimate(confidence)
+                if (w[1] <= precision*abs(w[0]) and
+                    t[1] <= precision*abs(t[0]) and
+                    self.waitBatches.correlation(w[2]) <= critical and
+                    tisBatches.correlation(t[2]) <= critical):
+                    converged = True
+                    break
+        w = self.waitBatches.estimate(confidence)
+        t = tisBatches.estimate(confidence)
+        result = {'converged':converged,
+                  'events':events,
+                  'customers':self.TISStat.n - customers,
+                  'time':self.currentTime,
+                  'warmup':max(w[2], t[2])*tisBatches.batch_size,
+                  'batch_size':tisBatches.batch_size,
+                  'waitingTime':w[:2],
+                  'TIS':t[:2]}
+        self.waitBatches = None
+        self.TISBatches = None
+        return result
+
+    def close_trace(self):
+        '''
+        Writes the buffered trace records and closes the trace file
+        '''
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def record_service(self, number, waitingTime, serviceTime):
+        '''
+        Records the statistics of customer number when it starts service
+        '''
+        self.waitStat.add(waitingTime)
+        self.serviceStat.add(serviceTime)
+        self.TISStat.add(waitingTime + serviceTime)
+        self.waitSketch.add(waitingTime)
+        if self.TISBatches is not None:
+            self.waitBatches.add(waitingTime)
+            self.TISBatches.add(waitingTime + serviceTime)
+        if self.keep_records:
+            self.waitingTime[number] = waitingTime
+            self.serviceTime[number] = serviceTime
+            self.TIS[number] = waitingTime + serviceTime
+
+    def get_stat(self):
+        '''
+        Returns a dictionary of (observations, average, stdev) tuples for
+        waiting time, service time and time in system.
+        '''
+        return dict((name, (stat.n, stat.mean, stat.stdev()))
+                    for name, stat in (('waitingTime', self.waitStat),
+                                       ('serviceTime', self.serviceStat),
+                                       ('TIS', self.TISStat)))
+
+    def get_quantiles(self, quantiles = (0.5, 0.95, 0.99)):
+        '''
+        Returns a dictionary of the estimated quantiles of waiting time keyed
+        by quantiles
+        '''
+        return dict((q, self.waitSketch.quantile(q)) for q in quantiles)
 
     def print_stat(self):
         '''
         Print statistics to stdout.
         '''
-        for k in self.waitingTime:
-            self.TIS[k] = self.waitingTime[k] + self.serviceTime[k]
-        n1 = len(self.waitingTime)
-        n2 = len(self.serviceTime)
-        n3 = len(self.TIS)
-        av1 = sum(self.waitingTime.values())/n1
-        av2 = sum(self.serviceTime.values())/n2
-        av3 = sum(self.TIS.values())/n3
-        stdev1 = sqrt(sum([pow(self.waitingTime[i]-av1,2) for i in self.waitingTime])/(n1-1))
-        stdev2 = sqrt(sum([pow(self.serviceTime[i]-av2,2) for i in self.serviceTime])/(n2-1))
-        stdev3 = sqrt(sum([pow(self.TIS[i]-av3,2) for i in self.TIS])/(n3-1))
-        print '\n'
-        print 'Seed: ', self.seed
-        print 'Mode', self.queueing_mode
-        print 'Simulation ended at ', self.currentTime
-        print '=========================\t STATISTICS',
-        print ' \t ========================='
-        print '\t\t\tObservations\tAverage\t\tStDev'
-        print 'Waiting Time\t\t', n1, '\t\t', av1, '\t', stdev1
-        print 'Service Time\t\t', n2, '\t\t', av2, '\t', stdev2
-        print 'Time is System\t\t', n3, '\t\t', av3, '\t', stdev3
+        stat = self.get_stat()
+        n1, av1, stdev1 = stat['waitingTime']
+        n2, av2, stdev2 = stat['serviceTime']
+        n3, av3, stdev3 = stat['TIS']
+        print('\n')
+        print('Seed: ', self.seed)
+        print('Mode', self.queueing_mode)
+        print('Simulation ended at ', self.currentTime)
+        print('=========================\t STATISTICS', end = ' ')
+        print(' \t =========================')
+        print('\t\t\tObservations\tAverage\t\tStDev')
+        print('Waiting Time\t\t%s \t\t%s \t%s' % (n1, av1, stdev1))
+        print('Service Time\t\t%s \t\t%s \t%s' % (n2, av2, stdev2))
+        print('Time is System\t\t%s \t\t%s \t%s' % (n3, av3, stdev3))
+        q = self.get_quantiles()
+        # No quantiles before the first customer starts service
+        values = tuple('-' if q[p] is None else '%.6g' % q[p]
+                       for p in (0.5, 0.95, 0.99))
+        print('\t\t\tMedian\t\t95th\t\t99th')
+        print('Waiting Time\t\t%s \t\t%s \t%s' % values)
 
     def add_event(self, eventType, eventTime, serverNumber = None):
         '''
         Adds event to the eventTable
         '''        
         self.eventCounter += 1
-        self.eventTable.push(Event(eventType, self.eventCounter, 
-                                   eventTime, serverNumber))
+        self.eventTable.push(eventType, self.eventCounter, eventTime,
+                             serverNumber)
 
     def get_event(self):
         '''
         Gets the first event in the event table
         '''        
         e = self.eventTable.pop()
-        self.currentTime = e.eventTime
+        dt = e[0] - self.currentTime
+        self.waitingArea += dt*self.numWaiting
+        self.busyArea += dt*self.numBusy
+        self.currentTime = e[0]
         return e
 
+    def get_time_average(self):
+        '''
+        Returns a dictionary of metrics averaged over time from 0 to
+        currentTime with keys
+        'queueLength':        average number of customers waiting
+        'inSystem':           average number of customers in the system
+        'utilization':        average fraction of busy servers
+        'serverUtilization':  list of the busy fractions of each server
+        '''
+        T = self.currentTime
+        if T <= 0:
+            return {'queueLength':0.0, 'inSystem':0.0, 'utilization':0.0,
+                    'serverUtilization':[0.0]*self.server_num}
+        busy = list(self.busyTime)
+        for i in range(self.server_num):
+            if self.server[i] == BUSY:
+                busy[i] += T - self.busyStart[i]
+        return {'queueLength':self.waitingArea/T,
+                'inSystem':(self.waitingArea + self.busyArea)/T,
+                'utilization':self.busyArea/(T*self.server_num),
+                'serverUtilization':[b/T for b in busy]}
+
+    def instrument(self, callback = None, interval = 1.0):
+        '''
+        Attaches and returns an Instrumentation, callback is called with its
+        snapshot about every interval wall-clock seconds
+        '''
+        self.uninstrument()
+        self.instrumentation = Instrumentation(self, callback, interval)
+        return self.instrumentation
+
+    def uninstrument(self):
+        '''
+        Detaches the Instrumentation, if any
+        '''
+        if self.instrumentation is not None:
+            self.instrumentation.detach()
+            self.instrumentation = None
+
     def draw_screen(self):
         '''
         Draws the status of the system to the screen
@@ -443,29 +2343,63 @@ class EventQueue(object):
             pygame.draw.rect(self.background, self.colors[self.server[i]],
                              self.rec[i])
         # Draw customer rectangles
-        if self.queueing_mode == 'single':
-            nrInQ = self.sqList[0].size()
+        for j in range(len(self.shownQueue)):
+            nrInQ = self.sqList[j].size()
             for i in range(46):
-                rect = (690-i*15,305,self.cDimension[0],self.cDimension[1])
+                rect = self.customer_rect(j, i)
                 if i<nrInQ:
                     pygame.draw.rect(self.background,self.colors['c'],rect)
                 else:
                     pygame.draw.rect(self.background,self.colors['bg'],rect)
+            self.shownQueue[j] = min(nrInQ, 46)
+        self.shownServer = self.server[:len(self.rec)]
+
+    def draw_changes(self):
+        '''
+        Draws the servers whose state and the queues whose length changed
+        since the last drawing and updates only those parts of the screen
+        '''
+        rects = []
+        for i in range(len(self.rec)):
+            state = self.server[i]
+            if state != self.shownServer[i]:
+                pygame.draw.rect(self.background, self.colors[state],
+                                 self.rec[i])
+                rects.append(self.rec[i])
+                self.shownServer[i] = state
+        for j in range(len(self.shownQueue)):
+            nrInQ = min(self.sqList[j].size(), 46)
+            old = self.shownQueue[j]
+            if nrInQ == old:
+                continue
+            color = self.colors['c'] if nrInQ > old else self.colors['bg']
+            for i in range(min(nrInQ, old), max(nrInQ, old)):
+                rect = self.customer_rect(j, i)
+                pygame.draw.rect(self.background, color, rect)
+                rects.append(rect)
+            self.shownQueue[j] = nrInQ
+        for rect in rects:
+            self.screen.blit(self.background, rect, rect)
+        pygame.display.update(rects)
+
+    def customer_rect(self, j, i):
+        '''
+        Returns the rectangle of the i-th customer in the j-th queue
+        '''
+        if self.queueing_mode == 'single':
+            y = 305
         else:
-            for j in range(min(self.server_num, 50)):
-                nrInQ = self.sqList[j].size()
-                for i in range(46):
-                    rect = (690-i*15,self.server_position[j],
-                            self.cDimension[0], self.cDimension[1])
-                    if i<nrInQ:
-                        pygame.draw.rect(self.background,self.colors['c'],rect)
-                    else:
-                        pygame.draw.rect(self.background,self.colors['bg'],rect)
+            y = self.server_position[j]
+        return (690-i*15, y, self.cDimension[0], self.cDimension[1])
 
     def display_init(self):
         '''
-        Initializes pygame related parameters.
+        Initializes pygame related parameters, importing pygame on first use.
         '''        
+        global pygame, QUIT
+        if pygame is None:
+            import pygame
+            from pygame.locals import QUIT
         pygame.init()
         # pygame display parameters
         self.cDimension = (10, 10)
@@ -477,7 +2411,9 @@ class EventQueue(object):
         self.rec = [(740, self.server_position[i], self.sDimension[0],
                      self.sDimension[1])
                     for i in range(min(self.server_num, 50))]
-        self.framerate = 100
+        # Last drawn server states and (at most 46) queue lengths
+        self.shownServer = [None]*len(self.rec)
+        self.shownQueue = [0]*min(self.queue_num, 50)
         self.colors = {'bg':(0,0,0),
                        'c':(0,0,200),
                        False:(0,255,0),
@@ -490,6 +2426,25 @@ class EventQueue(object):
         self.clock = pygame.time.Clock()
 
 
+def restore(path, trace = None):
+    '''
+    Returns the EventQueue saved by EventQueue.checkpoint() to the file path.
+    The restored instance has no instrumentation, trace is as in the
+    EventQueue constructor. If trace is the path of the trace of the
+    checkpointed run, the trace is continued: the records written up to the
+    checkpoint are kept and the later ones are discarded.
+    '''
+    with open(path, 'rb') as f:
+        eq = pickle.load(f)
+    records = eq.__dict__.pop('traceRecords', None)
+    if isinstance(trace, str):
+        trace = TraceWriter(trace, append = records is not None)
+        if records is not None:
+            trace.truncate(records)
+    eq.trace = trace
+    return eq
+
+
 if __name__ == '__main__':
     length = 1000
     seedInput = 1
@@ -0,0 +1,319 @@
+'''
+Independent replications of the M/M/s queueing simulation
+Brief description:
+Runs independent replications of QueueSim.EventQueue over a process pool and
+reports confidence intervals on the per-replication averages.
+
+Detailed description:
+Each replication is one EventQueue(...).simulate(length) run in a worker
+process. Replication seeds are drawn from a master generator seeded with
+seedInput, so every replication uses its own random stream and the set of
+results does not depend on how replications are spread over the workers.
+With antithetic replications each seed is run twice, the second time with
+EventQueue(antithetic = True), and the average of the pair is one
+observation. compare_modes() runs the same seeds in several queueing modes
+with separate arrival, service and routing streams (common random numbers)
+and estimates the differences between the modes; the variance reduction
+reported is the variance the difference would have with independent
+single replications divided by the observed variance. Each replication also
+returns the quantile sketch of its waiting times, replicate() merges them
+into quantile estimates over all the customers of all the replications.
+Functions:
+    replication_seeds(seedInput,R):
+                               returns the R replication seeds derived from
+                               seedInput
+    run_replication(args):     runs a single replication, args is a tuple
+                               (seed, length, params) where params is a
+                               dictionary of EventQueue keyword arguments,
+                               returns EventQueue.get_stat() of the run with
+                               the additional key 'waitSketch', the
+                               QuantileSketch of waiting times
+    run_tasks(tasks,processes):
+                               returns the results of run_replication() on
+                               tasks, in order
+    replicate(R,length,seedInput,processes,confidence,antithetic,
+              quantiles,**params):
+                               runs R replications of length time units over
+                               a pool of processes workers (all cores if
+                               None, in this process if 1) and returns a
+                               dictionary with keys
+                               'seeds':        replication seeds
+                               'replications': list of get_stat() results
+                               'summary':      dictionary keyed by
+                                               'waitingTime', 'serviceTime'
+                                               and 'TIS' of (mean, stdev,
+                                               half-width) tuples of the
+                                               replication averages
+                               'confidence':   confidence level
+                               'quantiles':    dictionary of the waiting
+                                               time quantiles of the merged
+                                               sketches keyed by quantiles,
+                                               (0.5, 0.95, 0.99) by default
+                               'varianceReduction':
+                                               only with antithetic
+                                               replications, dictionary of
+                                               variance reduction factors
+                                               keyed as 'summary'
+    compare_modes(modes,R,length,seedInput,processes,confidence,common,
+                  antithetic,**params):
+                               runs R replications (pairs if antithetic) in
+                               each queueing mode of the list modes, with
+                               common random numbers if common, and returns
+                               a dictionary with keys
+                               'modes':        modes
+                               'observations': dictionary keyed by mode and
+                                               statistic name of lists of
+                                               observations
+                               'summary':      dictionary keyed by mode and
+                                               statistic name of (mean,
+                                               stdev, half-width) tuples
+                               'differences':  dictionary keyed by pairs
+                                               (modeA, modeB) and statistic
+                                               name of dictionaries with
+                                               keys 'mean', 'halfWidth',
+                                               'variance',
+                                               'independentVariance' and
+                                               'varianceReduction' of
+                                               modeB - modeA
+                               'confidence':   confidence level
+    print_summary(result):     prints the result of replicate() to stdout
+    print_comparison(result):  prints the result of compare_modes() to
+                               stdout
+'''
+
+__version__    = '1.0.0'
+__author__     = 'Aykut Bulut, Ted Ralphs (ayb211@lehigh.edu,ted@lehigh.edu)'
+__license__    = 'MIT'
+__maintainer__ = 'Aykut Bulut'
+__email__      = 'ayb211@lehigh.edu'
+__title__      = 'M/M/s queueing system replications'
+
+from random import Random
+from multiprocessing import Pool
+from QueueSim import EventQueue, RunningStat, QuantileSketch, half_width
+
+STATS = ('waitingTime', 'serviceTime', 'TIS')
+
+
+def replication_seeds(seedInput, R):
+    '''
+    Returns R replication seeds drawn from a generator seeded with seedInput
+    '''
+    master = Random(seedInput)
+    return [master.getrandbits(32) for r in range(R)]
+
+
+def run_replication(args):
+    '''
+    Runs a single replication and returns its statistics. args is a tuple
+    (seed, length, params), params is a dictionary of EventQueue keyword
+    arguments.
+    '''
+    seedInput, length, params = args
+    eq = EventQueue(seedInput = seedInput, graphics_mode = 'off', **params)
+    eq.simulate(length)
+    result = eq.get_stat()
+    result['waitSketch'] = eq.waitSketch
+    return result
+
+
+def run_tasks(tasks, processes = None):
+    '''
+    Returns the results of run_replication() on tasks in order, using a pool
+    of processes workers, all cores if None and this process if 1.
+    '''
+    if processes == 1:
+        return [run_replication(t) for t in tasks]
+    pool = Pool(processes)
+    try:
+        return pool.map(run_replication, tasks, chunksize = 1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _antithetic_params(params, antithetic):
+    '''
+    Returns the EventQueue parameters of the runs that make up one
+    observation, a single run or an antithetic pair
+    '''
+    if not antithetic:
+        return [params]
+    return [dict(params, antithetic = a) for a in (False, True)]
+
+
+def _observations(results, k, name):
+    '''
+    Returns the averages of statistic name over consecutive groups of k
+    results
+    '''
+    return [sum(r[name][1] for r in results[i:i+k])/k
+            for i in range(0, len(results), k)]
+
+
+def _variance(values):
+    '''
+    Returns the sample variance of values
+    '''
+    stat = RunningStat()
+    for v in values:
+        stat.add(v)
+    return stat.variance()
+
+
+def _summarize(values, confidence):
+    '''
+    Returns (mean, stdev, half-width) of values
+    '''
+    stat = RunningStat()
+    for v in values:
+        stat.add(v)
+    return stat.mean, stat.stdev(), half_width(stat, confidence)
+
+
+def _merged_quantiles(replications, quantiles):
+    '''
+    Returns the quantiles of the merged waiting time sketches of
+    replications
+    '''
+    sketch = QuantileSketch()
+    for rep in replications:
+        sketch.merge(rep['waitSketch'])
+    return dict((q, sketch.quantile(q)) for q in quantiles)
+
+
+def replicate(R, length, seedInput = 0, processes = None, confidence = 0.95,
+              antithetic = False, quantiles = (0.5, 0.95, 0.99), **params):
+    '''
+    Runs R replications of length time units each, params are passed to
+    EventQueue. Replications are distributed over processes workers, all
+    cores if processes is None, and run in this process if processes is 1.
+    If antithetic is True, R antithetic pairs are run instead. The waiting
+    time quantiles are estimated over all the replications.
+    '''
+    seeds = replication_seeds(seedInput, R)
+    runs = _antithetic_params(params, antithetic)
+    k = len(runs)
+    replications = run_tasks([(s, length, p) for s in seeds for p in runs],
+                             processes)
+    summary = {}
+    reduction = {}
+    for name in STATS:
+        obs = _observations(replications, k, name)
+        summary[name] = _summarize(obs, confidence)
+        if antithetic:
+            single = [rep[name][1] for rep in replications]
+            var = _variance(obs)
+            reduction[name] = (_variance(single)/k/var if var > 0
+                               else float('inf'))
+    result = {'seeds':seeds,
+              'replications':replications,
+              'summary':summary,
+              'confidence':confidence,
+              'quantiles':_merged_quantiles(replications, quantiles)}
+    if antithetic:
+        result['varianceReduction'] = reduction
+    return result
+
+
+def compare_modes(modes, R, length, seedInput = 0, processes = None,
+                  confidence = 0.95, common = True, antithetic = False,
+                  **params):
+    '''
+    Runs R replications, or R antithetic pairs if antithetic, in each of the
+    queueing modes and estimates the differences between the modes. With
+    common random numbers every mode uses the same seeds and separate
+    arrival, service and routing streams, so each mode sees the same
+    customers; otherwise every mode uses its own seeds.
+    '''
+    if common:
+        seeds = dict((m, replication_seeds(seedInput, R)) for m in modes)
+    else:
+        allSeeds = replication_seeds(seedInput, R*len(modes))
+        seeds = dict((m, allSeeds[i*R:(i+1)*R]) for i, m in enumerate(modes))
+    tasks = []
+    for m in modes:
+        runs = _antithetic_params(dict(params, queueing_mode = m,
+                                      streams = 'separate'), antithetic)
+        tasks.extend((s, length, p) for s in seeds[m] for p in runs)
+    k = len(runs)
+    results = run_tasks(tasks, processes)
+    perMode = dict((m, results[i*R*k:(i+1)*R*k])
+                   for i, m in enumerate(modes))
+    obs = dict((m, dict((name, _observations(perMode[m], k, name))
+                        for name in STATS))
+               for m in modes)
+    summary = dict((m, dict((name, _summarize(obs[m][name], confidence))
+                            for name in STATS))
+                   for m in modes)
+    differences = {}
+    for i, a in enumerate(modes):
+        for b in modes[i+1:]:
+            differences[(a, b)] = {}
+            for name in STATS:
+                diff = [y - x for x, y in zip(obs[a][name], obs[b][name])]
+                mean, stdev, hw = _summarize(diff, confidence)
+                # Variance of the difference of independent observations
+                indep = sum(_variance([r[name][1] for r in perMode[m]])
+                            for m in (a, b))/k
+                var = _variance(diff)
+                differences[(a, b)][name] = {
+                    'mean':mean,
+                    'halfWidth':hw,
+                    'variance':var,
+                    'independentVariance':indep,
+                    'varianceReduction':indep/var if var > 0 else float('inf')}
+    return {'modes':modes,
+            'observations':obs,
+            'summary':summary,
+            'differences':differences,
+            'confidence':confidence}
+
+
+def print_summary(result):
+    '''
+    Prints the result of replicate() to stdout.
+    '''
+    runs = '%d replications' % len(result['replications'])
+    if 'varianceReduction' in result:
+        runs = '%d antithetic pairs' % len(result['seeds'])
+    print('%s, %g%% confidence intervals' % (runs, 100*result['confidence']))
+    print('%-16s%-16s%-16s%-16s' % ('', 'Average', 'StDev', 'Half-width'))
+    for name, label in zip(STATS, ('Waiting Time', 'Service Time',
+                                   'Time in System')):
+        print('%-16s%-16.6g%-16.6g%-16.6g' % ((label,) +
+                                              result['summary'][name]))
+    quantiles = sorted(result['quantiles'])
+    print('%-16s' % 'Quantiles' +
+          ''.join('%-16s' % ('p%g' % (100*q)) for q in quantiles))
+    values = [result['quantiles'][q] for q in quantiles]
+    print('%-16s' % 'Waiting Time' +
+          ''.join('%-16s' % '-' if v is None else '%-16.6g' % v
+                  for v in values))
+
+
+def print_comparison(result):
+    '''
+    Prints the result of compare_modes() to stdout.
+    '''
+    print('%g%% confidence intervals' % (100*result['confidence']))
+    print('%-24s%-16s%-16s%-16s' % ('Time in System', 'Average',
+                                    'StDev', 'Half-width'))
+    for m in result['modes']:
+        print('%-24s%-16.6g%-16.6g%-16.6g' % ((m,) +
+                                              result['summary'][m]['TIS']))
+    print('%-24s%-16s%-16s%-16s' % ('Difference', 'Average', 'Half-width',
+                                    'Var. reduction'))
+    modes = result['modes']
+    for i, a in enumerate(modes):
+        for b in modes[i+1:]:
+            d = result['differences'][(a, b)]['TIS']
+            print('%-24s%-16.6g%-16.6g%-16.6g' % ('%s - %s' % (b, a),
+                                                  d['mean'], d['halfWidth'],
+                                                  d['varianceReduction']))
+
+
+if __name__ == '__main__':
+    result = replicate(20, 1000, seedInput = 1, IAT = 1, ST = 11,
+                       server_num = 11, queueing_mode = 'single')
+    print_summary(result)
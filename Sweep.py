@@ -0,0 +1,149 @@
+'''
+Parameter sweeps of the M/M/s queueing simulation
+Brief description:
+Runs QueueSim.EventQueue over a grid of parameter points in parallel and
+keeps the results in an SQLite cache, so that re-running or extending a
+sweep only simulates the points that are not in the cache yet.
+
+Detailed description:
+A point is a dictionary of EventQueue keyword arguments together with
+'seedInput' and 'length', the simulation length. Each result is stored
+under the SHA-1 hash of the point and of the code version as soon as it is
+available, so an interrupted sweep resumes where it left off. The code
+version is the hash of the QueueSim source, hence editing the simulator
+invalidates old results.
+Functions:
+    grid(**axes):              returns the list of points of the cartesian
+                               product of the given lists of values, e.g.
+                               grid(server_num = [1, 2], seedInput = [0, 1])
+    code_version():            returns the hash of the QueueSim source
+    point_key(point,version):  returns the cache key of point
+    run_point(point):          simulates point and returns the tuple
+                               (key, result), result is
+                               EventQueue.get_stat() plus 'currentTime'
+    sweep(points,cache,processes):
+                               returns the results of points in the same
+                               order, as decoded from JSON, only
+                               simulating the points missing from the cache
+                               file, over a pool of processes workers (all
+                               cores if None, in this process if 1)
+'''
+
+__version__    = '1.0.0'
+__author__     = 'Aykut Bulut, Ted Ralphs (ayb211@lehigh.edu,ted@lehigh.edu)'
+__license__    = 'MIT'
+__maintainer__ = 'Aykut Bulut'
+__email__      = 'ayb211@lehigh.edu'
+__title__      = 'M/M/s queueing system parameter sweeps'
+
+import os
+import json
+import sqlite3
+import hashlib
+from itertools import product
+from multiprocessing import Pool
+import QueueSim
+from QueueSim import EventQueue
+
+DEFAULT_CACHE = 'sweep.sqlite'
+
+
+def grid(**axes):
+    '''
+    Returns the list of points of the cartesian product of the given lists
+    of parameter values
+    '''
+    names = sorted(axes)
+    return [dict(zip(names, values))
+            for values in product(*[axes[n] for n in names])]
+
+
+def code_version():
+    '''
+    Returns the SHA-1 hash of the QueueSim source file
+    '''
+    source = os.path.splitext(QueueSim.__file__)[0] + '.py'
+    with open(source, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def point_key(point, version):
+    '''
+    Returns the cache key of point for the given code version
+    '''
+    text = json.dumps(point, sort_keys = True) + version
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def run_point(args):
+    '''
+    Simulates a point, args is a tuple (key, point). Returns (key, result).
+    '''
+    key, point = args
+    params = dict(point)
+    length = params.pop('length')
+    eq = EventQueue(graphics_mode = 'off', **params)
+    eq.simulate(length)
+    result = eq.get_stat()
+    result['currentTime'] = eq.currentTime
+    return key, result
+
+
+def open_cache(cache):
+    '''
+    Opens the cache file, creating the results table if needed
+    '''
+    db = sqlite3.connect(cache)
+    db.execute('CREATE TABLE IF NOT EXISTS results '
+               '(key TEXT PRIMARY KEY, point TEXT, version TEXT, '
+               'result TEXT)')
+    return db
+
+
+def sweep(points, cache = DEFAULT_CACHE, processes = None):
+    '''
+    Returns the results of points in the same order. Points that are not in
+    the cache are simulated over processes workers and stored one by one.
+    '''
+    version = code_version()
+    keys = [point_key(p, version) for p in points]
+    db = open_cache(cache)
+    try:
+        results = {}
+        for key, result in db.execute('SELECT key, result FROM results '
+                                      'WHERE version = ?', (version,)):
+            results[key] = json.loads(result)
+        todo = {}
+        for key, point in zip(keys, points):
+            if key not in results:
+                todo[key] = point
+        tasks = list(todo.items())
+        if processes == 1 or len(tasks) < 2:
+            done = (run_point(t) for t in tasks)
+            pool = None
+        else:
+            pool = Pool(processes)
+            done = pool.imap_unordered(run_point, tasks)
+        try:
+            for key, result in done:
+                result = json.dumps(result)
+                db.execute('INSERT OR REPLACE INTO results VALUES (?,?,?,?)',
+                           (key, json.dumps(todo[key], sort_keys = True),
+                            version, result))
+                db.commit()
+                # Same form as the results read back from the cache
+                results[key] = json.loads(result)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    finally:
+        db.close()
+    return [results[key] for key in keys]
+
+
+if __name__ == '__main__':
+    points = grid(seedInput = [1], IAT = [1], ST = [11], server_num = [11],
+                  queueing_mode = ['single', 'shortest'], length = [1000])
+    for point, result in zip(points, sweep(points)):
+        print('%-10s %s' % (point['queueing_mode'], result['TIS']))
@@ -0,0 +1,177 @@
+'''
+Binary event traces of the M/M/s queueing simulation
+Brief description:
+Contains TraceWriter, which EventQueue uses to record every processed event
+as a fixed-width binary record, and read_trace(), which memory-maps a trace
+file into a numpy structured array.
+
+Detailed description:
+A trace file starts with a 16 byte header, the magic string 'QSTRACE1'
+followed by the record size as a little-endian 64-bit integer. Records are
+32 bytes each, little-endian, with the fields
+    time:                  time of the event
+                           type: float64
+    number:                for arrivals, the number of the arriving
+                           customer; for departures, the number of the
+                           customer that starts service at the freed
+                           server, -1 if the server becomes idle
+                           type: int64
+    eventType:             ARRIVE or DEPART
+                           type: int32
+    server:                server that starts serving a customer or that
+                           becomes idle, -1 if an arriving customer waits
+                           type: int32
+    queue:                 queue that the customer joins or leaves
+                           type: int32
+    queueLength:           length of that queue after the event
+                           type: int32
+Classes contained:
+TraceWriter:
+    Buffered writer of trace records.
+    attributes:
+        path:                  path of the trace file
+                               type: string
+        records:               number of records written so far
+                               type: int
+    methods:
+        __init__(self,path,buffer_records=65536,append=False):
+                               constructor of the class, creates the file
+                               and writes the header, records are written to
+                               the file buffer_records at a time; if append
+                               is True and the file exists, its header is
+                               checked and its complete records are kept
+        write(self,time,eventType,number,server,queue,queueLength):
+                               appends a record
+        flush(self):           writes the buffered records to the file
+        truncate(self,records):
+                               discards the records after the first records
+                               ones
+        close(self):           flushes and closes the file
+Functions:
+    read_trace(path):          returns the records of the trace file as a
+                               read-only numpy.memmap of TRACE_DTYPE, only
+                               the slices that are used are read from disk
+Global Constants
+    MAGIC:                     header magic string
+    RECORD:                    struct.Struct of a record
+    TRACE_DTYPE:               list of (field, dtype) pairs of a record, the
+                               numpy dtype of read_trace()
+'''
+
+__version__    = '1.0.0'
+__author__     = 'Aykut Bulut, Ted Ralphs (ayb211@lehigh.edu,ted@lehigh.edu)'
+__license__    = 'MIT'
+__maintainer__ = 'Aykut Bulut'
+__email__      = 'ayb211@lehigh.edu'
+__title__      = 'M/M/s queueing system event traces'
+
+import os
+from struct import Struct
+
+MAGIC = b'QSTRACE1'
+HEADER = Struct('<8sq')
+RECORD = Struct('<dqiiii')
+TRACE_DTYPE = [('time', '<f8'), ('number', '<i8'), ('eventType', '<i4'),
+               ('server', '<i4'), ('queue', '<i4'), ('queueLength', '<i4')]
+
+
+class TraceWriter(object):
+    '''
+    Buffered writer of fixed-width trace records. See the file documentation
+    for description of attributes.
+    '''
+    def __init__(self, path, buffer_records = 65536, append = False):
+        '''
+        Constructor of the class, creates the file at path and writes the
+        header. If append is True and the file exists, new records are
+        written after its complete records, a partial last record is
+        discarded.
+        '''
+        self.path = path
+        self.buffer = bytearray(RECORD.size*buffer_records)
+        self.end = len(self.buffer)
+        self.offset = 0
+        self.flushed = 0
+        self._pack = RECORD.pack_into
+        if append and os.path.exists(path):
+            _check_header(path)
+            size = os.path.getsize(path) - HEADER.size
+            self.file = open(path, 'r+b')
+            self.flushed = size//RECORD.size
+            self.truncate(self.flushed)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, RECORD.size))
+
+    @property
+    def records(self):
+        '''
+        Number of records written so far, including the buffered ones
+        '''
+        return self.flushed + self.offset//RECORD.size
+
+    def write(self, time, eventType, number, server, queue, queueLength):
+        '''
+        Appends a record, server may be None for -1
+        '''
+        offset = self.offset
+        self._pack(self.buffer, offset, time, number, eventType,
+                   -1 if server is None else server, queue, queueLength)
+        # RECORD.size, inlined
+        offset += 32
+        self.offset = offset
+        if offset == self.end:
+            self.flush()
+
+    def flush(self):
+        '''
+        Writes the buffered records to the file
+        '''
+        self.file.write(self.buffer[:self.offset])
+        self.file.flush()
+        self.flushed += self.offset//RECORD.size
+        self.offset = 0
+
+    def truncate(self, records):
+        '''
+        Discards the records after the first records ones, new records are
+        written after them
+        '''
+        self.flush()
+        if records > self.flushed:
+            raise ValueError('%s has only %d records' % (self.path,
+                                                         self.flushed))
+        end = HEADER.size + records*RECORD.size
+        self.file.truncate(end)
+        self.file.seek(end)
+        self.flushed = records
+
+    def close(self):
+        '''
+        Flushes and closes the file
+        '''
+        self.flush()
+        self.file.close()
+
+
+def _check_header(path):
+    '''
+    Raises ValueError if the file at path does not start with a trace header
+    '''
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if (len(header) != HEADER.size or
+        HEADER.unpack(header) != (MAGIC, RECORD.size)):
+        raise ValueError('%s is not a trace file' % path)
+
+
+def read_trace(path):
+    '''
+    Returns the records of the trace file at path as a read-only
+    numpy.memmap with dtype TRACE_DTYPE
+    '''
+    import numpy
+    _check_header(path)
+    dtype = numpy.dtype(TRACE_DTYPE)
+    return numpy.memmap(path, dtype = dtype, mode = 'r',
+                        offset = HEADER.size)
@@ -0,0 +1,72 @@
+'''
+Event calendar benchmark
+Brief description:
+Compares the events/sec throughput of the event calendar backends of
+EventQueue ('heap' and 'blimpy').
+
+Detailed description:
+Two measurements are made for each backend.
+hold:      the classical hold model, the calendar is filled with a fixed
+           number of pending events and then each step pops the earliest
+           event and pushes a new one at an exponentially distributed
+           offset. This isolates the cost of the calendar itself.
+simulate:  a full EventQueue run in 'single' mode, events/sec is the number
+           of processed events divided by the wall-clock time.
+
+Usage:
+    python benchmarks/bench_calendar.py [events] [pending]
+events defaults to 1000000 and pending to 1000.
+'''
+
+import os
+import sys
+import time
+from random import seed, expovariate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from QueueSim import EventQueue, CALENDARS, ARRIVE
+
+
+def hold(calendar, events, pending):
+    '''
+    Runs the hold model on an empty calendar of the given backend and returns
+    events/sec
+    '''
+    seed(0)
+    table = CALENDARS[calendar]()
+    now = 0.0
+    for i in range(pending):
+        table.push(ARRIVE, i, expovariate(1.0))
+    start = time.time()
+    for i in range(pending, pending + events):
+        now = table.pop()[0]
+        table.push(ARRIVE, i, now + expovariate(1.0))
+    return events/(time.time() - start)
+
+
+def simulate(calendar, events):
+    '''
+    Simulates an M/M/10 system at utilization 0.9 until roughly the given
+    number of events are processed and returns events/sec
+    '''
+    eq = EventQueue(seedInput = 0, IAT = 1, ST = 9, server_num = 10,
+                    queueing_mode = 'single', calendar = calendar)
+    # Each customer generates one arrival and one departure event
+    length = events/2.0
+    start = time.time()
+    eq.simulate(length)
+    elapsed = time.time() - start
+    return eq.eventCounter/elapsed
+
+
+if __name__ == '__main__':
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    pending = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print('%-10s %-10s %15s' % ('calendar', 'benchmark', 'events/sec'))
+    for calendar in ('heap', 'blimpy'):
+        print('%-10s %-10s %15.0f' % (calendar, 'hold',
+                                      hold(calendar, events, pending)))
+        print('%-10s %-10s %15.0f' % (calendar, 'simulate',
+                                      simulate(calendar, events)))
@@ -0,0 +1,60 @@
+'''
+Import time benchmark
+Brief description:
+Measures the wall-clock cost of starting an interpreter and importing
+QueueSim in headless mode, compared to starting a bare interpreter.
+
+Detailed description:
+Each measurement runs a fresh interpreter in a subprocess, best of the given
+number of runs is reported. The benchmark also checks that importing
+QueueSim does not load pygame, numpy or coinor.blimpy. It exits with status
+1 if an optional dependency is loaded or if the import overhead exceeds the
+limit.
+
+Usage:
+    python benchmarks/bench_import.py [runs] [limit]
+runs defaults to 10, limit is in milliseconds and defaults to 100.
+'''
+
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+CHECK = ("import sys, QueueSim; "
+         "sys.exit(int(any(m in sys.modules "
+         "for m in ('pygame', 'numpy', 'coinor.blimpy'))))")
+
+
+def startup(code, runs):
+    '''
+    Returns the best wall-clock time in seconds of running code in a fresh
+    interpreter and its exit status
+    '''
+    best = None
+    status = 0
+    for i in range(runs):
+        start = time.time()
+        status = subprocess.call([sys.executable, '-c', code], cwd = ROOT)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, status
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    limit = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+    bare, status = startup('pass', runs)
+    headless, status = startup(CHECK, runs)
+    overhead = 1000*(headless - bare)
+    print('bare interpreter      %8.1f ms' % (1000*bare))
+    print('import QueueSim       %8.1f ms' % (1000*headless))
+    print('import overhead       %8.1f ms' % overhead)
+    if status != 0:
+        print('FAIL: importing QueueSim loaded an optional dependency')
+        sys.exit(1)
+    if overhead > limit:
+        print('FAIL: import overhead above %g ms' % limit)
+        sys.exit(1)
@@ -0,0 +1,105 @@
+'''
+Customer queue benchmark
+Brief description:
+Compares the memory use and throughput of the customer queue types of
+EventQueue ('compact' and 'blimpy').
+
+Detailed description:
+memory:    bytes per waiting customer, measured by walking the object graph
+           of a queue holding the given number of customers
+hold:      operations/sec of a queue kept at the given length, each step
+           dequeues the first customer and enqueues a new one
+simulate:  events/sec of an M/M/1 EventQueue run at utilization 0.99, where
+           long queues build up, using the matching calendar ('heap' with
+           'compact', 'blimpy' with 'blimpy')
+
+Usage:
+    python benchmarks/bench_queues.py [customers] [events]
+customers defaults to 4000 and events to 200000.
+'''
+
+import os
+import sys
+import gc
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from QueueSim import EventQueue, QUEUE_TYPES
+
+CALENDAR = {'compact':'heap', 'blimpy':'blimpy'}
+
+
+def deep_size(obj):
+    '''
+    Returns the total size of the objects reachable from obj, not counting
+    classes, functions and modules
+    '''
+    skip = (type, types.ModuleType, types.FunctionType)
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, skip):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        stack.extend(gc.get_referents(o))
+    return total
+
+
+def fill(queue_type, customers):
+    '''
+    Returns a queue of the given type holding customers customers
+    '''
+    q = QUEUE_TYPES[queue_type]()
+    for i in range(customers):
+        q.enqueue(float(i), 1.0 + i, i)
+    return q
+
+
+def memory(queue_type, customers):
+    '''
+    Returns bytes per customer of a queue holding customers customers
+    '''
+    empty = deep_size(QUEUE_TYPES[queue_type]())
+    return (deep_size(fill(queue_type, customers)) - empty)/float(customers)
+
+
+def hold(queue_type, customers, steps):
+    '''
+    Returns operations/sec of a queue kept at customers customers
+    '''
+    q = fill(queue_type, customers)
+    start = time.time()
+    for i in range(steps):
+        q.dequeue()
+        q.enqueue(float(i), 1.0, i)
+    return 2*steps/(time.time() - start)
+
+
+def simulate(queue_type, events):
+    '''
+    Returns events/sec of an M/M/1 run at utilization 0.99
+    '''
+    eq = EventQueue(seedInput = 0, IAT = 1, ST = 0.99, server_num = 1,
+                    queueing_mode = 'single', queue_type = queue_type,
+                    calendar = CALENDAR[queue_type])
+    start = time.time()
+    eq.simulate(events/2.0)
+    return eq.eventCounter/(time.time() - start)
+
+
+if __name__ == '__main__':
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    print('%-10s %18s %15s %15s' % ('queue', 'bytes/customer', 'hold ops/sec',
+                                    'events/sec'))
+    for queue_type in ('compact', 'blimpy'):
+        print('%-10s %18.1f %15.0f %15.0f' %
+              (queue_type, memory(queue_type, customers),
+               hold(queue_type, customers, 20000),
+               simulate(queue_type, events)))
@@ -0,0 +1,256 @@
+'''
+Simulation core benchmark suite
+Brief description:
+Measures events/sec, peak memory and time per simulated customer of
+EventQueue over a grid of server counts, queueing modes and utilizations,
+writes the results as JSON and compares a run against a stored baseline.
+
+Detailed description:
+Each case runs in a fresh interpreter, so that its peak memory is not
+hidden by an earlier case. A case builds an M/M/s EventQueue with mean
+service time 1 and the inter-arrival time that gives the requested
+utilization, processes events/5 warm-up events with EventQueue.step() and
+then times the next events events, best of repeat runs. The measurements
+are
+eventsPerSecond:       processed events per wall-clock second
+secondsPerCustomer:    wall-clock seconds per arriving customer
+peakMemory:            peak memory allocated while building the
+                       EventQueue and running the case, in bytes, measured
+                       in an extra untimed run with tracemalloc where it
+                       is available (Python 3), otherwise the growth of the
+                       peak resident set size of the process
+A case that fails records the error instead. The JSON file holds a 'meta'
+dictionary (interpreter, platform, date, QueueSim source hash and memory
+method) and the list 'results'.
+
+compare reads a baseline and a current result file and flags as
+regressions the cases whose events/sec dropped or whose peak memory grew by
+more than the tolerance, and the cases that fail now but did not in the
+baseline. It exits with status 1 if there is a regression.
+
+Usage:
+    python benchmarks/bench_suite.py run [output] [--events N] [--repeat R]
+           [--servers S [S ...]] [--modes M [M ...]]
+           [--utilizations U [U ...]]
+    python benchmarks/bench_suite.py compare baseline current
+           [--tolerance T]
+output defaults to bench_suite.json, events to 100000, repeat to 3,
+servers to 1 10 100 1000 10000, modes to single shortest random power-of-d,
+utilizations to 0.5 0.8 0.95 0.99 and tolerance to 0.1.
+'''
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+SERVERS = [1, 10, 100, 1000, 10000]
+MODES = ['single', 'shortest', 'random', 'power-of-d']
+UTILIZATIONS = [0.5, 0.8, 0.95, 0.99]
+# Peak memory changes below this many bytes are treated as noise
+MEMORY_NOISE = 1 << 20
+
+
+def memory_method():
+    '''
+    Returns 'tracemalloc' if it is available, 'maxrss' otherwise
+    '''
+    try:
+        import tracemalloc
+    except ImportError:
+        return 'maxrss'
+    return 'tracemalloc'
+
+
+def peak_rss():
+    '''
+    Returns the peak resident set size of this process in bytes
+    '''
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else 1024*peak
+
+
+def simulate(server_num, queueing_mode, utilization, events):
+    '''
+    Builds the EventQueue of a case, runs the warm-up and the timed events
+    and returns (elapsed seconds, customers arrived in the timed part)
+    '''
+    from QueueSim import EventQueue
+    eq = EventQueue(seedInput = 0, IAT = 1.0/(utilization*server_num),
+                    ST = 1.0, server_num = server_num,
+                    queueing_mode = queueing_mode)
+    eq.step(events//5)
+    customers = eq.customerCounter
+    start = time.time()
+    eq.step(events)
+    elapsed = time.time() - start
+    return elapsed, eq.customerCounter - customers
+
+
+def measure(server_num, queueing_mode, utilization, events, repeat):
+    '''
+    Runs one case in this process and returns its result dictionary
+    '''
+    # Imported first so that the module is not counted as case memory
+    import QueueSim
+    case = (server_num, queueing_mode, utilization, events)
+    before = peak_rss()
+    elapsed, customers = min(simulate(*case) for i in range(repeat))
+    peak = peak_rss() - before
+    if memory_method() == 'tracemalloc':
+        import tracemalloc
+        tracemalloc.start()
+        simulate(*case)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'server_num':server_num,
+            'queueing_mode':queueing_mode,
+            'utilization':utilization,
+            'events':events,
+            'seconds':elapsed,
+            'customers':customers,
+            'eventsPerSecond':events/elapsed,
+            'secondsPerCustomer':elapsed/max(customers, 1),
+            'peakMemory':peak}
+
+
+def run_case(server_num, queueing_mode, utilization, events, repeat):
+    '''
+    Runs one case in a fresh interpreter and returns its result dictionary
+    '''
+    args = json.dumps([server_num, queueing_mode, utilization, events,
+                       repeat])
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                              'case', args], cwd = ROOT,
+                             stdout = subprocess.PIPE,
+                             stderr = subprocess.PIPE)
+    out, err = child.communicate()
+    if child.returncode != 0:
+        lines = err.decode('utf-8', 'replace').strip().splitlines()
+        return {'server_num':server_num,
+                'queueing_mode':queueing_mode,
+                'utilization':utilization,
+                'events':events,
+                'error':lines[-1] if lines else 'exit %d' % child.returncode}
+    return json.loads(out.decode('utf-8'))
+
+
+def run(output, events, repeat, servers, modes, utilizations):
+    '''
+    Runs the grid of cases, prints a table and writes the JSON file output
+    '''
+    from Sweep import code_version
+    meta = {'python':platform.python_version(),
+            'platform':platform.platform(),
+            'date':time.strftime('%Y-%m-%d %H:%M:%S'),
+            'codeVersion':code_version(),
+            'memory':memory_method()}
+    results = []
+    print('%8s %-10s %6s %12s %14s %12s' % ('servers', 'mode', 'rho',
+                                            'events/sec', 'us/customer',
+                                            'peak MB'))
+    for s in servers:
+        for m in modes:
+            for u in utilizations:
+                r = run_case(s, m, u, events, repeat)
+                results.append(r)
+                if 'error' in r:
+                    print('%8d %-10s %6.2f  error: %s' % (s, m, u,
+                                                          r['error']))
+                else:
+                    print('%8d %-10s %6.2f %12.0f %14.2f %12.1f' %
+                          (s, m, u, r['eventsPerSecond'],
+                           1e6*r['secondsPerCustomer'],
+                           r['peakMemory']/float(1 << 20)))
+    with open(output, 'w') as f:
+        json.dump({'meta':meta, 'results':results}, f, indent = 1,
+                  sort_keys = True)
+
+
+def case_key(result):
+    '''
+    Returns the tuple identifying the case of result
+    '''
+    return (result['server_num'], result['queueing_mode'],
+            result['utilization'])
+
+
+def compare(baseline, current, tolerance):
+    '''
+    Compares the result files baseline and current, prints the cases of
+    both and returns the number of regressions
+    '''
+    with open(baseline) as f:
+        old = dict((case_key(r), r) for r in json.load(f)['results'])
+    with open(current) as f:
+        new = json.load(f)['results']
+    regressions = 0
+    print('%8s %-10s %6s %14s %14s  %s' % ('servers', 'mode', 'rho',
+                                           'events/sec', 'peak memory',
+                                           ''))
+    for r in new:
+        key = case_key(r)
+        if key not in old:
+            continue
+        b = old[key]
+        flags = []
+        if 'error' in r:
+            if 'error' not in b:
+                flags.append('now fails: %s' % r['error'])
+            speed = memory = float('nan')
+        elif 'error' in b:
+            speed = memory = float('nan')
+        else:
+            speed = r['eventsPerSecond']/b['eventsPerSecond'] - 1
+            growth = r['peakMemory'] - b['peakMemory']
+            memory = growth/float(max(b['peakMemory'], MEMORY_NOISE))
+            if speed < -tolerance:
+                flags.append('slower')
+            if memory > tolerance and growth > MEMORY_NOISE:
+                flags.append('more memory')
+        if flags:
+            regressions += 1
+        print('%8d %-10s %6.2f %+13.1f%% %+13.1f%%  %s' %
+              (key + (100*speed, 100*memory, ', '.join(flags))))
+    return regressions
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'case':
+        print(json.dumps(measure(*json.loads(sys.argv[2]))))
+        sys.exit(0)
+    parser = argparse.ArgumentParser(description = 'Simulation core '
+                                     'benchmark suite')
+    commands = parser.add_subparsers(dest = 'command')
+    p = commands.add_parser('run', help = 'run the benchmarks')
+    p.add_argument('output', nargs = '?', default = 'bench_suite.json')
+    p.add_argument('--events', type = int, default = 100000)
+    p.add_argument('--repeat', type = int, default = 3)
+    p.add_argument('--servers', type = int, nargs = '+', default = SERVERS)
+    p.add_argument('--modes', nargs = '+', default = MODES)
+    p.add_argument('--utilizations', type = float, nargs = '+',
+                   default = UTILIZATIONS)
+    p = commands.add_parser('compare', help = 'compare against a baseline')
+    p.add_argument('baseline')
+    p.add_argument('current')
+    p.add_argument('--tolerance', type = float, default = 0.1)
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args.output, args.events, args.repeat, args.servers, args.modes,
+            args.utilizations)
+    elif args.command == 'compare':
+        regressions = compare(args.baseline, args.current, args.tolerance)
+        if regressions:
+            print('FAIL: %d regressions' % regressions)
+            sys.exit(1)
+    else:
+        parser.print_help()
+        sys.exit(2)